@@ -0,0 +1,96 @@
+"""
+Load/save benchmark for the league database file
+
+Builds synthetic leagues of 1k/10k/100k players (records shaped like the
+ones database.py writes), then times saving and loading players.json the
+old way (stdlib, indent=2) against the codec layer, compact and pretty.
+
+    python benchmarks/bench_database.py [sizes...] [--repeat N]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot_final_v10modules"))
+
+import codec  # noqa: E402
+from storage import atomic_write_text  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+TEAMS = ("ferrari", "mercedes", "red_bull", "mclaren", "aston_martin", "alpine", "williams", "rb", "sauber", "haas")
+
+
+def build_league(players: int) -> dict:
+    """Synthetic database with `players` registrations and a full attendance board"""
+    start = datetime(2026, 1, 1)
+    db = {"players": {}, "attendance": {}, "races_history": [], "schema_version": 2}
+    for i in range(players):
+        uid = str(100_000_000_000_000_000 + i)
+        stamp = (start + timedelta(minutes=i)).isoformat()
+        db["players"][uid] = {
+            "username": f"Jezdec Č.{i}",
+            "role": "driver" if i % 4 else "reserve",
+            "team": TEAMS[i % len(TEAMS)],
+            "answers": {"ea_id": f"EA_{i}", "platform": "PC", "experience": "2 roky ligového ježdění"},
+            "registered_at": stamp,
+            "total_points": (i * 7) % 400,
+            "races_completed": i % 24,
+            "wins": i % 5,
+            "podiums": i % 9,
+            "fastest_laps": i % 3,
+            "penalties": {"total_points": i % 12},
+            "last_activity": stamp,
+            "missed_races": i % 4,
+        }
+        db["attendance"][uid] = {"username": f"Jezdec Č.{i}", "status": "Driver", "updated_at": stamp}
+    for r in range(24):
+        db["races_history"].append({"race_name": f"Round {r + 1}", "participants": list(db["players"])[:20],
+                                    "date": (start + timedelta(days=14 * r)).isoformat()})
+    return db
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _stdlib_load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(sizes, repeat: int) -> None:
+    variants = (
+        ("stdlib indent=2 (old)", lambda db: json.dumps(db, indent=2, ensure_ascii=False), _stdlib_load),
+        (f"{codec.BACKEND} compact", codec.dumps, codec.load_file),
+        (f"{codec.BACKEND} pretty", lambda db: codec.dumps(db, pretty=True), codec.load_file),
+    )
+    print(f"codec backend: {codec.BACKEND}, best of {repeat}")
+    print(f"{'players':>8}  {'format':<24} {'size MB':>8} {'save ms':>9} {'load ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.json")
+        for size in sizes:
+            db = build_league(size)
+            for name, encode, load in variants:
+                save_s = _best(lambda: atomic_write_text(path, encode(db)), repeat)
+                load_s = _best(lambda: load(path), repeat)
+                assert load(path) == db
+                mb = os.path.getsize(path) / 1_000_000
+                print(f"{size:>8}  {name:<24} {mb:>8.2f} {save_s * 1000:>9.1f} {load_s * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if "--repeat" in args:
+        at = args.index("--repeat")
+        repeat = int(args[at + 1])
+        del args[at:at + 2]
+    run([int(a) for a in args] or DEFAULT_SIZES, repeat)
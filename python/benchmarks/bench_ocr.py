@@ -0,0 +1,93 @@
+"""
+OCR benchmark: full frame vs table region (ROI) vs per-cell OCR
+
+For each screenshot (default: obrazek.png) times preprocessing and Tesseract
+on the whole frame, on the detected results table and cell by cell (for
+cells, "prep" is the table segmentation), and checks that each run reads
+the same rows as the full frame. Without a Tesseract binary only the
+preprocessing is timed. The ROI gain only shows on a full-screen capture:
+when the table fills the image (like the bundled obrazek.png, which is
+already cropped) the benchmark says the gain was not measured.
+
+    python benchmarks/bench_ocr.py [images...] [--repeat N]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2  # noqa: E402
+import pytesseract  # noqa: E402
+
+import f1hook  # noqa: E402
+
+
+def _best(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _tesseract_available() -> bool:
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+
+
+def run(images, repeat: int) -> None:
+    ocr = _tesseract_available()
+    if not ocr:
+        print("⚠️ Tesseract not found, timing preprocessing only")
+    print(f"best of {repeat}")
+    print(f"{'image':<24} {'mode':<5} {'roi ms':>7} {'prep ms':>8} {'Mpx':>6} {'ocr ms':>8} {'rows':>5} {'same':>5}")
+    for path in images:
+        img = cv2.imread(path)
+        if img is None:
+            print(f"❌ Cannot read {path}")
+            continue
+        roi_s, box = _best(lambda: f1hook.find_table_roi(img), repeat)
+        rows_by_mode = {}
+        table = f1hook.crop_table(img)
+        for mode, roi, cells in (("full", False, False), ("roi", True, False), ("cells", True, True)):
+            if cells:
+                prep_s, segments = _best(lambda: f1hook.segment_table(table), repeat)
+                if segments is None:
+                    print(f"{os.path.basename(path)[:24]:<24} {mode:<5} table could not be segmented")
+                    continue
+                mpx = sum((y1 - y0) * (x1 - x0) for y0, y1 in segments[0] for name, (x0, x1) in
+                          segments[1].items() if name in f1hook.CELL_CONFIGS) * f1hook.UPSCALE ** 2 / 1_000_000
+            else:
+                prep_s, thresh = _best(lambda: f1hook.preprocess(img, roi), repeat)
+                mpx = thresh.shape[0] * thresh.shape[1] / 1_000_000
+            ocr_ms, rows, same = "-", "-", "-"
+            if ocr:
+                ocr_s, (_, rows_by_mode[mode]) = _best(lambda: f1hook.recognize(img, roi, cells), repeat)
+                ocr_ms = f"{(ocr_s - prep_s) * 1000:.0f}"
+                rows = len(rows_by_mode[mode])
+                if mode != "full":
+                    same = "yes" if rows_by_mode[mode] == rows_by_mode["full"] else "no"
+            roi_ms = f"{roi_s * 1000:.1f}" if roi else "-"
+            print(f"{os.path.basename(path)[:24]:<24} {mode:<5} {roi_ms:>7} {prep_s * 1000:>8.1f} {mpx:>6.2f} "
+                  f"{ocr_ms:>8} {rows:>5} {same:>5}")
+        if box and box[2] * box[3] < img.shape[0] * img.shape[1]:
+            print(f"{'':<24} table at x={box[0]} y={box[1]} {box[2]}x{box[3]} of {img.shape[1]}x{img.shape[0]}")
+        else:
+            print(f"{'':<24} ⚠️ ROI gain not measured: {'the table fills the whole image' if box else 'no table found'}"
+                  f" (use a full-screen capture)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if "--repeat" in args:
+        at = args.index("--repeat")
+        repeat = int(args[at + 1])
+        del args[at:at + 2]
+    run(args or [os.path.join(ROOT, "obrazek.png")], repeat)
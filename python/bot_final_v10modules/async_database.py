@@ -0,0 +1,95 @@
+"""
+Async facade over database.py for discord.py handlers.
+
+Every call runs off the event loop: changes go through one writer thread
+(a queue, so they apply in the order they were made), queries run on a
+small reader pool against the latest committed snapshot, so they never wait
+for the writer. A query the snapshot cannot serve (another process changed
+the files, or stored data such as the standings must be rebuilt first) is
+handed to the writer. Results are private copies, so handlers never hold a
+reference into the database while another thread is changing it.
+
+    import async_database as db
+    player = await db.get_player(user_id)
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import database
+
+# Query functions that never change the database; everything else is a write
+READ_FUNCTIONS = {
+    "load_database",
+    "get_player",
+    "get_all_players",
+    "get_players_by_role",
+    "get_player_by_ea_id",
+    "get_attendance",
+    "get_attendance_by_status",
+    "get_penalty_points",
+    "get_penalty_history",
+    "get_race_lineup",
+    "get_championship_standings",
+    "get_user_race_history",
+    "get_race_index",
+    "get_archived_race",
+    "get_inactive_users",
+    "export_to_csv_string",
+    "export_to_json_string",
+    "get_driver_stats",
+    "get_board_message",
+    "get_notification_outcomes",
+    "get_qualifying_history",
+    "get_team_drivers",
+    "is_team_full",
+    "get_constructor_standings",
+    "get_records",
+    "get_calendar",
+    "get_next_race",
+    "get_completed_races",
+    "get_upcoming_races",
+    "get_database_generation",
+}
+
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database-writer")
+_readers = ThreadPoolExecutor(max_workers=config.DATABASE_READ_WORKERS, thread_name_prefix="database-reader")
+
+
+def _wrap(name: str):
+    fn = getattr(database, name)
+    if not callable(fn) or name.startswith("_") or name in ("transaction", "snapshot_call", "locked_call"):
+        raise AttributeError(f"database.{name} is not a public function")
+    read_only = name in READ_FUNCTIONS
+
+    @functools.wraps(fn)
+    async def call(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        if read_only:
+            try:
+                return await loop.run_in_executor(
+                    _readers, functools.partial(database.snapshot_call, fn, *args, **kwargs)
+                )
+            except database.SnapshotUnavailable:
+                pass
+        return await loop.run_in_executor(
+            _writer, functools.partial(database.locked_call, fn, *args, **kwargs)
+        )
+
+    return call
+
+
+def __getattr__(name: str):
+    """`await async_database.<name>(...)` for any public function in database.py"""
+    call = _wrap(name)
+    globals()[name] = call
+    return call
+
+
+async def close() -> None:
+    """Wait for queued writes, then flush the database (call on shutdown)"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, functools.partial(_writer.shutdown, wait=True))
+    _readers.shutdown(wait=False)
+    await loop.run_in_executor(None, database.close_database)
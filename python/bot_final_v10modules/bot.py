@@ -6,7 +6,7 @@ from discord import app_commands
 from discord.ui import Select, View, Modal, TextInput
 from discord.ext import commands, tasks
 import config
-import database
+import async_database as db
 import datetime
 
 # --- SETUP ---
@@ -19,6 +19,8 @@ class LeagueBot(discord.Client):
         self.tree = app_commands.CommandTree(self)
 
     async def setup_hook(self):
+        # Upgrade stored data to the current schema before handling any interaction
+        await db.migrate_database()
         self.add_view(LeagueRegistrationView())
 
     async def on_ready(self):
@@ -34,6 +36,11 @@ class LeagueBot(discord.Client):
         except Exception as e:
             print(f"❌ Error syncing commands: {e}")
 
+    async def close(self):
+        # Finish queued writes and write out batched database changes before disconnecting
+        await db.close()
+        await super().close()
+
 bot = LeagueBot()
 
 # --- ⚖️ FIA APPLICANT SYSTEM ---
@@ -90,7 +97,7 @@ class FIAModal(Modal):
 
 async def handle_submission(interaction: discord.Interaction, role_value: str, role_name: str, answers: dict):
     # Register in database
-    database.register_player(
+    await db.register_player(
         user_id=interaction.user.id,
         username=str(interaction.user),
         role=role_value,
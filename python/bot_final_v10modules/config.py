@@ -48,6 +48,19 @@ ROLE_ADMIN_ID = 1455952224315506942
 ROLE_UNDER_REVIEW = os.getenv("ROLE_UNDER_REVIEW")
 ROLE_UNDER_TESTING = os.getenv("ROLE_UNDER_TESTING")
 
+# ═══════════════════════════════════════════════════════════════
+# DATABASE
+# ═══════════════════════════════════════════════════════════════
+DATABASE_BACKEND = "json"  # Úložiště dat: "json" (players.json) nebo "sqlite"
+SQLITE_DATABASE_FILE = "players.db"  # Soubor SQLite databáze (ve složce data/)
+DATABASE_FLUSH_INTERVAL = 30  # Po kolika sekundách se uloží celý soubor (změny jdou hned do žurnálu; 0 = okamžitě)
+DATABASE_POLL_INTERVAL = 2  # Jak často (s) kontrolovat změny od jiných procesů (ostatní boti, web)
+DATABASE_READ_WORKERS = 4  # Počet vláken pro čtení z databáze (zápisy jdou vždy jedním vláknem)
+DATABASE_PRETTY_JSON = False  # True = odsazený players.json (čitelnější, ale pomalejší a větší); export je vždy odsazený
+HISTORY_DIR = "history"  # Složka (v data/) s historií závodů, kvalifikací a trestů (jeden podadresář na sezónu)
+CURRENT_SEASON = "2026"  # Aktuální sezóna – nové výsledky se zapisují do její historie
+RACES_DIR = "races"  # Archiv závodů (v data/): jeden soubor YYYY-MM-DD_okruh.json na závod + index sezóny
+
 # ═══════════════════════════════════════════════════════════════
 # MODULE 1: PENALTY SYSTEM
 # ═══════════════════════════════════════════════════════════════
@@ -67,6 +80,7 @@ MAX_MAIN_GRID_SIZE = 20  # Maximální kapacita hlavního gridu
 POINTS_SYSTEM = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]  # Body pro pozice 1-10
 FASTEST_LAP_BONUS = 1  # Extra bod za nejrychlejší kolo
 FASTEST_LAP_MIN_POSITION = 10  # Fastest lap bonus pouze pokud dojede v top 10
+STATS_FORM_RACES = 5  # Forma jezdce ve statistikách = posledních N závodů
 STANDINGS_MESSAGE_ID = None  # ID standings embedu (bot automaticky uloží)
 
 # ═══════════════════════════════════════════════════════════════
@@ -0,0 +1,188 @@
+"""
+Append-only history segments (race results, qualifying, penalties)
+
+History is kept out of the player database so that routine writes such as
+attendance clicks don't re-serialise seasons of results. Every season has
+its own directory with one JSON-lines segment per kind:
+
+    history/2026/championship.jsonl
+    history/2026/qualifying.jsonl
+    history/2026/penalties.jsonl
+
+Each line is one entry tagged with the player's user ID. Lines are only
+ever appended (one fsynced write per call), so other processes sharing the
+directory pick up new entries by reading just the tail of a segment.
+
+Database transactions queue their entries with tx.write_log("history", ...)
+(see write_journaled): the entries are journaled with the change and carry
+its journal sequence number, so a replay after a crash adds exactly the
+entries that did not make it to the segment.
+In memory, entries are kept as the typed records from models.py.
+"""
+import itertools
+import os
+import threading
+
+import codec
+from models import PenaltyEntry, QualiEntry, RaceEntry
+from storage import _fsync_directory, atomic_write_text
+
+KINDS = ("championship", "qualifying", "penalties")
+MODELS = {"championship": RaceEntry, "qualifying": QualiEntry, "penalties": PenaltyEntry}
+
+
+def _is_imported(line: str) -> bool:
+    try:
+        entry = codec.loads(line)
+    except ValueError:
+        return False  # damaged lines are kept as they are (and skipped when read)
+    return isinstance(entry, dict) and bool(entry.get("imported"))
+
+
+class HistoryLog:
+    """Per-season history segments with an in-memory per-player view of each"""
+
+    def __init__(self, directory: str, season: str):
+        self.directory = directory
+        self.season = str(season)
+        self._lock = threading.RLock()
+        self._segments = {}  # path -> {"serial", "ino", "offset", "seqs", "by_user": {user_id: [entries]}}
+        self._serials = itertools.count()
+
+    def path(self, kind: str, season: str = None) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown history kind: {kind}")
+        return os.path.join(self.directory, str(season or self.season), f"{kind}.jsonl")
+
+    def append(self, kind: str, user_id_str: str, entry: dict, season: str = None) -> None:
+        self.append_many(kind, [(user_id_str, entry)], season)
+
+    def append_many(self, kind: str, rows: list, season: str = None, seq: int = None, replay: bool = False) -> None:
+        """
+        Append (user_id, entry) pairs to a segment in a single write. Rows
+        tagged with a journal sequence number `seq` that are written again
+        (`replay`) skip the ones the segment already has from before a crash.
+        """
+        path = self.path(kind, season)
+        with self._lock:
+            if replay and seq is not None:
+                rows = rows[self._tail(path, MODELS[kind])["seqs"].get(seq, 0):]
+            if not rows:
+                return
+            extra = {} if seq is None else {"seq": seq}
+            text = "".join(codec.dumps({"user_id": uid, **entry, **extra}) + "\n" for uid, entry in rows)
+            created = not os.path.exists(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        text = "\n" + text  # close a line torn by a crash mid-append
+                f.write(text.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                _fsync_directory(os.path.dirname(path))
+
+    def write_journaled(self, items: list, seq: int = None, replay: bool = False) -> None:
+        """
+        Side log writer for DatabaseStore.add_log(): items are
+        [kind, season, user_id, entry], one write per segment.
+        """
+        segments = {}
+        for kind, season, user_id_str, entry in items:
+            segments.setdefault((kind, season), []).append((user_id_str, entry))
+        for (kind, season), rows in segments.items():
+            self.append_many(kind, rows, season, seq, replay)
+
+    def import_entries(self, kind: str, rows: list, season: str = None) -> None:
+        """
+        Write entries moved in from elsewhere (schema migration). Entries from
+        an earlier, interrupted import are replaced, so running it again is safe.
+        """
+        path = self.path(kind, season)
+        with self._lock:
+            kept = []
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    kept = [line for line in f if line.strip() and not _is_imported(line)]
+            lines = [
+                codec.dumps({"user_id": uid, **entry, "imported": True}) + "\n"
+                for uid, entry in rows
+            ]
+            if not lines and not kept:
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_text(path, "".join(lines + kept))
+
+    def for_player(self, kind: str, user_id_str: str, season: str = None) -> list:
+        """One player's entries of a kind for a season (current season by default), oldest first"""
+        return [entry.to_dict() for entry in self.records(kind, user_id_str, season)]
+
+    def records(self, kind: str, user_id_str: str, season: str = None) -> list:
+        """Like for_player(), as typed records (RaceEntry, QualiEntry, PenaltyEntry)"""
+        with self._lock:
+            return list(self._tail(self.path(kind, season), MODELS[kind])["by_user"].get(user_id_str, ()))
+
+    def entries(self, kind: str, season: str = None) -> dict:
+        """All players' entries of a kind for a season: {user_id: [entries]}"""
+        with self._lock:
+            by_user = self._tail(self.path(kind, season), MODELS[kind])["by_user"]
+            return {uid: [entry.to_dict() for entry in entries] for uid, entries in by_user.items()}
+
+    def version(self, user_id_str: str, kinds: tuple = KINDS, season: str = None) -> tuple:
+        """
+        Changes whenever an entry of these kinds is added for the player (or a
+        segment is rewritten). Per-player lists only ever grow within a segment,
+        so equal versions mean equal entries.
+        """
+        with self._lock:
+            return tuple(
+                (segment["serial"], len(segment["by_user"].get(user_id_str, ())))
+                for segment in (self._tail(self.path(kind, season), MODELS[kind]) for kind in kinds)
+            )
+
+    def seasons(self) -> list:
+        """Seasons that have any history, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isdir(os.path.join(self.directory, name)))
+
+    def _tail(self, path: str, model) -> dict:
+        """Segment view for `path`, after reading whatever was appended since last time"""
+        segment = self._segments.get(path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if segment is None or segment["ino"] is not None:
+                segment = {"serial": next(self._serials), "ino": None, "offset": 0, "seqs": {}, "by_user": {}}
+                self._segments[path] = segment
+            return segment
+
+        # A replaced (rewritten) file starts over from the beginning
+        if segment is None or segment["ino"] != st.st_ino or st.st_size < segment["offset"]:
+            segment = {"serial": next(self._serials), "ino": st.st_ino, "offset": 0, "seqs": {},
+                       "by_user": {}}
+            self._segments[path] = segment
+
+        if st.st_size > segment["offset"]:
+            with open(path, "rb") as f:
+                f.seek(segment["offset"])
+                chunk = f.read(st.st_size - segment["offset"])
+            # Only consume complete lines; a writer may be mid-append
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    print(f"⚠️ Skipping damaged history line in {path}")
+                    continue
+                segment["by_user"].setdefault(entry.get("user_id"), []).append(model.from_dict(entry))
+                if entry.get("seq") is not None:
+                    segment["seqs"][entry["seq"]] = segment["seqs"].get(entry["seq"], 0) + 1
+            segment["offset"] += end
+        return segment
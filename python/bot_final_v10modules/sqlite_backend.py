@@ -0,0 +1,258 @@
+"""
+SQLite storage backend for the player database
+
+Stores the same document that database.py works with (players, attendance,
+races_history, calendar, ...) in tables. Only rows that changed since
+the last load/save are written.
+
+One-shot import of an existing players.json:
+    python sqlite_backend.py [players.json] [players.db]
+"""
+import os
+import sqlite3
+import sys
+import threading
+
+import codec
+
+# Players and attendance are looked up through the in-memory indexes of the
+# store, so their rows only carry the key, the username (for reading the file
+# by hand) and the document. Files written before keep their extra columns;
+# inserts name their columns so both layouts load and save.
+
+# Per-player history tables of older files; history now lives in per-season
+# segment files (history.py), these are only read so migration can move them
+LEGACY_HISTORY_TABLES = ("championship_history", "qualifying_history", "penalties")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS races_history (
+    seq INTEGER PRIMARY KEY,
+    race_name TEXT,
+    date TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS calendar (
+    seq INTEGER PRIMARY KEY,
+    round INTEGER,
+    race_name TEXT,
+    status TEXT,
+    date_timestamp INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_calendar_status ON calendar(status, date_timestamp);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value) -> str:
+    return codec.dumps(value, sort_keys=True)
+
+
+class SqliteBackend:
+    """Load/save the database document from an SQLite file, writing only changed rows"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Serialized form of every row as last loaded/saved, used to skip unchanged rows
+        self._saved = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ─── Whole-document load/save ─────────────────────────────────
+
+    def load(self) -> dict:
+        """Read the full database document"""
+        with self._lock:
+            players = {user_id: codec.loads(data) for user_id, data in self._conn.execute("SELECT user_id, data FROM players")}
+            attendance = {user_id: codec.loads(data) for user_id, data in self._conn.execute("SELECT user_id, data FROM attendance")}
+            races_history = [codec.loads(d) for (d,) in self._conn.execute("SELECT data FROM races_history ORDER BY seq")]
+            calendar = [codec.loads(d) for (d,) in self._conn.execute("SELECT data FROM calendar ORDER BY seq")]
+
+            db = {"players": players, "attendance": attendance, "races_history": races_history}
+            if calendar or self._conn.execute("SELECT 1 FROM meta WHERE key = '__calendar__'").fetchone():
+                db["calendar"] = calendar
+            for key, value in self._conn.execute("SELECT key, value FROM meta WHERE key != '__calendar__'"):
+                db[key] = codec.loads(value)
+
+            self._remember(db)
+            # After _remember, so the history moved onto the records counts as unsaved
+            self._attach_legacy_history(players)
+            return db
+
+    def save(self, db: dict) -> None:
+        """Write the database document, touching only rows that changed"""
+        with self._lock, self._conn:
+            self._save_players(db.get("players", {}))
+            self._save_attendance(db.get("attendance", {}))
+            self._save_list("races_history", db.get("races_history", []))
+            if "calendar" in db:
+                self._save_list("calendar", db["calendar"])
+                self._save_meta("__calendar__", True)
+            for key, value in db.items():
+                if key not in ("players", "attendance", "races_history", "calendar"):
+                    self._save_meta(key, value)
+            stale = [k for k in self._saved.get("meta", {})
+                     if k != "__calendar__" and k not in db]
+            for key in stale:
+                self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+                del self._saved["meta"][key]
+
+    # ─── Internals ────────────────────────────────────────────────
+
+    def _legacy_tables(self) -> list:
+        return [name for (name,) in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                if name in LEGACY_HISTORY_TABLES]
+
+    def _attach_legacy_history(self, players: dict) -> None:
+        """Put rows of the old history tables back on the player records (for the schema 2 migration)"""
+        for table in self._legacy_tables():
+            for user_id, data in self._conn.execute(f"SELECT user_id, data FROM {table} ORDER BY user_id, seq"):
+                player = players.get(user_id)
+                if player is None:
+                    continue
+                if table == "penalties":
+                    player.setdefault("penalties", {"total_points": 0}).setdefault("history", []).append(codec.loads(data))
+                else:
+                    player.setdefault(table, []).append(codec.loads(data))
+
+    def _remember(self, db: dict) -> None:
+        """Record the serialized state of everything just loaded"""
+        saved = {"players": {}, "attendance": {}, "meta": {}}
+        for user_id, player in db["players"].items():
+            saved["players"][user_id] = _dumps(player)
+        for user_id, entry in db["attendance"].items():
+            saved["attendance"][user_id] = _dumps(entry)
+        saved["races_history"] = [_dumps(e) for e in db["races_history"]]
+        saved["calendar"] = [_dumps(e) for e in db.get("calendar", [])]
+        for key, value in db.items():
+            if key not in ("players", "attendance", "races_history", "calendar"):
+                saved["meta"][key] = _dumps(value)
+        if "calendar" in db:
+            saved["meta"]["__calendar__"] = _dumps(True)
+        self._saved = saved
+
+    def _save_players(self, players: dict) -> None:
+        saved = self._saved.setdefault("players", {})
+
+        # Loaded history rows are now part of the player records being written
+        for table in self._legacy_tables():
+            self._conn.execute(f"DROP TABLE {table}")
+
+        for user_id in [uid for uid in saved if uid not in players]:
+            self._conn.execute("DELETE FROM players WHERE user_id = ?", (user_id,))
+            del saved[user_id]
+
+        for user_id, player in players.items():
+            text = _dumps(player)
+            if saved.get(user_id) != text:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO players (user_id, username, data) VALUES (?, ?, ?)",
+                    (user_id, player.get("username"), text)
+                )
+                saved[user_id] = text
+
+    def _save_attendance(self, attendance: dict) -> None:
+        saved = self._saved.setdefault("attendance", {})
+        for user_id in [uid for uid in saved if uid not in attendance]:
+            self._conn.execute("DELETE FROM attendance WHERE user_id = ?", (user_id,))
+            del saved[user_id]
+        for user_id, entry in attendance.items():
+            text = _dumps(entry)
+            if saved.get(user_id) != text:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO attendance (user_id, username, data) VALUES (?, ?, ?)",
+                    (user_id, entry.get("username"), text)
+                )
+                saved[user_id] = text
+
+    def _save_list(self, table: str, entries: list) -> None:
+        new = [_dumps(e) for e in entries]
+        old = self._saved.get(table, [])
+        if new == old:
+            return
+        if new[:len(old)] == old:
+            start = len(old)
+        else:
+            self._conn.execute(f"DELETE FROM {table}")
+            start = 0
+        for seq in range(start, len(entries)):
+            entry = entries[seq]
+            if table == "races_history":
+                self._conn.execute("INSERT INTO races_history VALUES (?, ?, ?, ?)",
+                                   (seq, entry.get("race_name"), entry.get("date"), new[seq]))
+            else:
+                self._conn.execute("INSERT INTO calendar VALUES (?, ?, ?, ?, ?, ?)",
+                                   (seq, entry.get("round"), entry.get("race_name"), entry.get("status"),
+                                    entry.get("date_timestamp"), new[seq]))
+        self._saved[table] = new
+
+    def _save_meta(self, key: str, value) -> None:
+        saved = self._saved.setdefault("meta", {})
+        text = _dumps(value)
+        if saved.get(key) != text:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, text))
+            saved[key] = text
+
+
+def migrate_json_to_sqlite(json_path: str, sqlite_path: str) -> dict:
+    """Import an existing players.json into an SQLite database"""
+    db = codec.load_file(json_path)
+    if not isinstance(db, dict):
+        raise ValueError(f"{json_path} does not contain a database object")
+    db.setdefault("players", {})
+    db.setdefault("attendance", {})
+    db.setdefault("races_history", [])
+
+    backend = SqliteBackend(sqlite_path)
+    try:
+        backend.load()  # Start from what is already there so re-running the import is safe
+        backend.save(db)
+    finally:
+        backend.close()
+
+    return {
+        "players": len(db["players"]),
+        "attendance": len(db["attendance"]),
+        "races": len(db["races_history"]),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3:
+        source, target = sys.argv[1], sys.argv[2]
+    else:
+        import database
+        source = sys.argv[1] if len(sys.argv) > 1 else database.DATABASE_FILE
+        target = database.SQLITE_DATABASE_FILE
+
+    if not os.path.exists(source):
+        print(f"❌ File {source} not found.")
+        sys.exit(1)
+
+    counts = migrate_json_to_sqlite(source, target)
+    print(f"✅ Imported into {target}: {counts['players']} players, "
+          f"{counts['attendance']} attendance entries, {counts['races']} races")
@@ -2,15 +2,18 @@
 Discord League Registration Bot - Role-Specific Version
 Advanced version with unique Modals for Driver, Steward, and Commentator
 """
+import asyncio
 import discord
 from discord import app_commands
 from discord.ui import Select, View, Modal, TextInput
 from discord.ext import tasks  # MODULE 10: Automated notifications
 import config
-import database
+import async_database as db
 import datetime
 import csv
+import hashlib
 import io
+import json
 
 # --- 🗓️ ATTENDANCE VIEW ---
 class AttendanceBoard(View):
@@ -20,143 +23,216 @@ class AttendanceBoard(View):
 
     @discord.ui.button(label="Jezdec", style=discord.ButtonStyle.green, custom_id="att_driver", emoji="🏎️")
     async def driver_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        database.update_attendance(interaction.user.id, str(interaction.user), "Driver")
+        await db.update_attendance(interaction.user.id, str(interaction.user), "Driver")
         await self.update_message(interaction)
 
     @discord.ui.button(label="Komentátor", style=discord.ButtonStyle.blurple, custom_id="att_comm", emoji="🎙️")
     async def comm_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        database.update_attendance(interaction.user.id, str(interaction.user), "Commentator")
+        await db.update_attendance(interaction.user.id, str(interaction.user), "Commentator")
         await self.update_message(interaction)
 
     @discord.ui.button(label="Maršál", style=discord.ButtonStyle.gray, custom_id="att_marshal", emoji="⚖️")
     async def marshal_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        database.update_attendance(interaction.user.id, str(interaction.user), "Marshal")
+        await db.update_attendance(interaction.user.id, str(interaction.user), "Marshal")
         await self.update_message(interaction)
 
     @discord.ui.button(label="Možná", style=discord.ButtonStyle.secondary, custom_id="att_maybe", emoji="🤔")
     async def maybe_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        database.update_attendance(interaction.user.id, str(interaction.user), "Maybe")
+        await db.update_attendance(interaction.user.id, str(interaction.user), "Maybe")
         await self.update_message(interaction)
 
     @discord.ui.button(label="Neúčastním se", style=discord.ButtonStyle.red, custom_id="att_no", emoji="❌")
     async def no_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        database.update_attendance(interaction.user.id, str(interaction.user), "Declined")
+        await db.update_attendance(interaction.user.id, str(interaction.user), "Declined")
         await self.update_message(interaction)
 
 
     async def update_message(self, interaction: discord.Interaction):
-        """Re-render the attendance list with a premium Sesh-like look"""
-        data = database.get_attendance()
-        
-        # Lists for categories
-        drivers = []
-        commentators = []
-        marshals = []
-        
-        maybe = []
-        declined = []
-
-        # Process all entries based on saved STATUS
-        for user_id_str, entry in data.items():
-            user_id = int(user_id_str)
-            status = entry.get('status', 'Declined')
-            mention = f"<@{user_id}>"
-            
-            if status == "Driver":
-                drivers.append((user_id, mention))  # Store tuple for sorting
-            elif status == "Commentator":
-                commentators.append(mention)
-            elif status == "Marshal":
-                marshals.append(mention)
-            elif status == "Accepted": # Fallback for old data
-                 drivers.append((user_id, mention))
-            elif status == "Maybe":
-                maybe.append(mention)
-            elif status == "Declined":
-                declined.append(mention)
-
-        # MODULE 3: Reserve Priority - Split drivers into Main Grid and Reserves
-        main_grid = []
-        reserves = []
-        
-        # Sort drivers by role (main drivers first, then reserves)
-        try:
-            guild = interaction.guild
-            reserve_role_id = int(config.ROLE_RESERVE) if config.ROLE_RESERVE else None
-            
-            for user_id, mention in drivers:
-                member = guild.get_member(user_id)
-                if member and reserve_role_id:
-                    # Check if user has reserve role
-                    has_reserve_role = any(role.id == reserve_role_id for role in member.roles)
-                    if has_reserve_role:
-                        reserves.append(mention)
-                    else:
-                        main_grid.append(mention)
-                else:
-                    # If can't determine role, add to main grid
-                    main_grid.append(mention)
-            
-            # Enforce grid limit
-            if len(main_grid) > config.MAX_MAIN_GRID_SIZE:
-                # Move excess to reserves
-                overflow = main_grid[config.MAX_MAIN_GRID_SIZE:]
-                main_grid = main_grid[:config.MAX_MAIN_GRID_SIZE]
-                reserves = overflow + reserves
-                
-        except Exception as e:
-            print(f"❌ Error processing reserve priority: {e}")
-            # Fallback: all drivers in one list
-            main_grid = [m for _, m in drivers]
-            reserves = []
+        """Acknowledge the click right away; the board is re-rendered by the coalescer"""
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+        attendance_renderer.request(interaction.message, self)
+
 
-        total = len(main_grid) + len(reserves) + len(commentators) + len(marshals) + len(maybe)
+async def build_attendance_embed(guild: discord.Guild) -> discord.Embed:
+    """Render the attendance list with a premium Sesh-like look"""
+    by_status = await db.get_attendance_by_status()
+
+    def mentions(status):
+        return [f"<@{user_id}>" for user_id in by_status.get(status, [])]
+
+    commentators = mentions("Commentator")
+    marshals = mentions("Marshal")
+    maybe = mentions("Maybe")
+    declined = mentions("Declined")
+
+    # MODULE 3: Reserve Priority - Split drivers into Main Grid and Reserves
+    main_grid = []
+    reserves = []
+    for user_id in by_status.get("Driver", []) + by_status.get("Accepted", []):  # Accepted: old data
+        mention = f"<@{user_id}>"
+        if reserve_roster.is_reserve(guild, int(user_id)):
+            reserves.append(mention)
+        else:
+            main_grid.append(mention)
+
+    # Enforce grid limit
+    if len(main_grid) > config.MAX_MAIN_GRID_SIZE:
+        # Move excess to reserves
+        overflow = main_grid[config.MAX_MAIN_GRID_SIZE:]
+        main_grid = main_grid[:config.MAX_MAIN_GRID_SIZE]
+        reserves = overflow + reserves
+
+    total = len(main_grid) + len(reserves) + len(commentators) + len(marshals) + len(maybe)
+    
+    embed = discord.Embed(
+        title="🏁 Nadcházející závod: Registrace",
+        description=f"Celkem přihlášeno: **{total}**",
+        color=0x2b2d31, # Professional dark grey
+        timestamp=discord.utils.utcnow()
+    )
+    
+    # Helper to format lists
+    def fmt_list(lst, numbered=True):
+        if not lst: return "_Nikdo_"
+        if numbered:
+            return "\n".join([f"{i+1}. {u}" for i, u in enumerate(lst)])
+        return ", ".join(lst)
         
-        embed = discord.Embed(
-            title="🏁 Nadcházející závod: Registrace",
-            description=f"Celkem přihlášeno: **{total}**",
-            color=0x2b2d31, # Professional dark grey
-            timestamp=discord.utils.utcnow()
+    # Add Fields - MODULE 3: Separate Main Grid and Reserves
+    if main_grid or reserves:
+        embed.add_field(
+            name=f"🏁 Main Grid ({len(main_grid)}/{config.MAX_MAIN_GRID_SIZE})", 
+            value=fmt_list(main_grid), 
+            inline=False
         )
-        
-        # Helper to format lists
-        def fmt_list(lst, numbered=True):
-            if not lst: return "_Nikdo_"
-            if numbered:
-                return "\n".join([f"{i+1}. {u}" for i, u in enumerate(lst)])
-            return ", ".join(lst)
-            
-        # Add Fields - MODULE 3: Separate Main Grid and Reserves
-        if main_grid or reserves:
+        if reserves:
             embed.add_field(
-                name=f"🏁 Main Grid ({len(main_grid)}/{config.MAX_MAIN_GRID_SIZE})", 
-                value=fmt_list(main_grid), 
+                name=f"🔄 Reserves ({len(reserves)})", 
+                value=fmt_list(reserves, numbered=False), 
                 inline=False
             )
-            if reserves:
-                embed.add_field(
-                    name=f"🔄 Reserves ({len(reserves)})", 
-                    value=fmt_list(reserves, numbered=False), 
-                    inline=False
-                )
-        else:
-            embed.add_field(name="🏎️ Jezdci (0)", value="_Nikdo_", inline=False)
-            
-        embed.add_field(name=f"🎙️ Komentátoři ({len(commentators)})", value=fmt_list(commentators, numbered=False), inline=False)
-        embed.add_field(name=f"⚖️ Maršálové ({len(marshals)})", value=fmt_list(marshals, numbered=False), inline=False)
-
-        embed.add_field(name=f"🤔 Možná ({len(maybe)})", value=fmt_list(maybe, numbered=False), inline=False)
-        embed.add_field(name=f"❌ Neúčastním se ({len(declined)})", value=fmt_list(declined, numbered=False), inline=False)
+    else:
+        embed.add_field(name="🏎️ Jezdci (0)", value="_Nikdo_", inline=False)
         
-        if interaction.guild.icon:
-            embed.set_thumbnail(url=interaction.guild.icon.url)
-            
-        embed.set_footer(text="Klikni na tlačítka níže pro registraci")
+    embed.add_field(name=f"🎙️ Komentátoři ({len(commentators)})", value=fmt_list(commentators, numbered=False), inline=False)
+    embed.add_field(name=f"⚖️ Maršálové ({len(marshals)})", value=fmt_list(marshals, numbered=False), inline=False)
+
+    embed.add_field(name=f"🤔 Možná ({len(maybe)})", value=fmt_list(maybe, numbered=False), inline=False)
+    embed.add_field(name=f"❌ Neúčastním se ({len(declined)})", value=fmt_list(declined, numbered=False), inline=False)
+    
+    if guild.icon:
+        embed.set_thumbnail(url=guild.icon.url)
         
-        if not interaction.response.is_done():
-            await interaction.response.edit_message(embed=embed, view=self)
-        else:
-            await interaction.message.edit(embed=embed, view=self)
+    embed.set_footer(text="Klikni na tlačítka níže pro registraci")
+    return embed
+
+
+class ReserveRoster:
+    """
+    Members holding the reserve role, per guild. Filled from the role once
+    the guild's member list is complete, then kept current by member
+    update/leave events, so classifying a driver is a set lookup instead of
+    a scan over their roles.
+    """
+    def __init__(self, role_id):
+        self.role_id = int(role_id) if role_id else None
+        self._members = {}  # guild id -> set of member ids
+
+    def _for_guild(self, guild: discord.Guild):
+        """Reserve member ids, or None while the guild's members are still being chunked"""
+        members = self._members.get(guild.id)
+        if members is None:
+            if not guild.chunked:
+                return None
+            role = guild.get_role(self.role_id) if self.role_id else None
+            members = self._members[guild.id] = {m.id for m in role.members} if role else set()
+        return members
+
+    def is_reserve(self, guild: discord.Guild, user_id: int) -> bool:
+        members = self._for_guild(guild)
+        if members is None:
+            # Partial member list: ask the member's own roles, cache nothing yet
+            member = guild.get_member(user_id)
+            return bool(self.role_id and member and member.get_role(self.role_id))
+        return user_id in members
+
+    def reset(self) -> None:
+        """Forget all cached lists (role changes may have been missed while disconnected)"""
+        self._members.clear()
+
+    def member_updated(self, member: discord.Member) -> None:
+        if self.role_id and member.guild.id in self._members:
+            if member.get_role(self.role_id):
+                self._members[member.guild.id].add(member.id)
+            else:
+                self._members[member.guild.id].discard(member.id)
+
+    def member_left(self, member: discord.Member) -> None:
+        self._members.get(member.guild.id, set()).discard(member.id)
+
+
+reserve_roster = ReserveRoster(config.ROLE_RESERVE)
+
+
+class AttendanceRenderer:
+    """
+    Coalesces attendance board edits per message: at most one edit per
+    `window` seconds, always rendered from the latest state. A rate-limited
+    edit is retried after Discord's retry-after (or an exponential backoff).
+    """
+    def __init__(self, window: float, max_backoff: float):
+        self.window = window
+        self.max_backoff = max_backoff
+        self._pending = {}  # message id -> (message, view) waiting for a render
+        self._tasks = {}    # message id -> render loop task
+        self._last = {}     # message id -> loop time of the last edit
+
+    def forget(self, message_id: int) -> None:
+        """Drop everything kept for a deleted board message"""
+        self._pending.pop(message_id, None)
+        self._last.pop(message_id, None)
+
+    def request(self, message: discord.Message, view: View) -> None:
+        self._pending[message.id] = (message, view)
+        if message.id not in self._tasks:
+            self._tasks[message.id] = asyncio.create_task(self._render_loop(message.id))
+
+    async def _render_loop(self, message_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        backoff = self.window
+        try:
+            while message_id in self._pending:
+                wait = self._last.get(message_id, 0) + self.window - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # clicks arriving meanwhile just replace the pending state
+                message, view = self._pending.pop(message_id)
+                try:
+                    embed = await build_attendance_embed(message.guild)
+                    await message.edit(embed=embed, view=view)
+                    backoff = self.window
+                except discord.NotFound:
+                    self._pending.pop(message_id, None)  # board was deleted
+                except (discord.RateLimited, discord.HTTPException) as e:
+                    if isinstance(e, discord.HTTPException) and e.status != 429:
+                        print(f"❌ Error updating attendance board: {e}")
+                        continue
+                    delay = min(getattr(e, "retry_after", None) or backoff, self.max_backoff)
+                    print(f"⏳ Attendance board rate limited, retrying in {delay:.1f}s")
+                    self._pending.setdefault(message_id, (message, view))
+                    await asyncio.sleep(delay)
+                    backoff = min(backoff * 2, self.max_backoff)
+                finally:
+                    self._last[message_id] = loop.time()
+        finally:
+            self._tasks.pop(message_id, None)
+            # Edits older than the window no longer delay anything
+            now = loop.time()
+            for stale in [mid for mid, at in self._last.items() if at + self.window <= now and mid not in self._tasks]:
+                del self._last[stale]
+
+
+attendance_renderer = AttendanceRenderer(config.ATTENDANCE_RENDER_WINDOW, config.ATTENDANCE_RENDER_MAX_BACKOFF)
 
 # --- 🏎️ DRIVER MODAL ---
 class DriverModal(Modal):
@@ -351,7 +427,7 @@ class MIADecisionModal(Modal):
         limit_exceeded = False
         total_penalty_points = 0
         if penalty_user_id and points_to_add > 0:
-            result = database.add_penalty_points(
+            result = await db.add_penalty_points(
                 user_id=penalty_user_id,
                 points=points_to_add,
                 reason=self.decision.value,
@@ -677,7 +753,7 @@ class ApplicationReviewView(View):
 async def handle_submission(interaction: discord.Interaction, role_value: str, role_name: str, answers: dict):
     """Generic handler for storing data and sending notifications"""
     # Register in database
-    result = database.register_player(
+    result = await db.register_player(
         user_id=interaction.user.id,
         username=str(interaction.user),
         role=role_value,
@@ -790,6 +866,8 @@ class LeagueBot(discord.Client):
         self.synced = False
     
     async def setup_hook(self):
+        # Upgrade stored data to the current schema before handling any interaction
+        await db.migrate_database()
         self.add_view(LeagueRegistrationView())
         self.add_view(AttendanceBoard())
         self.add_view(IncidentReportView())
@@ -800,6 +878,7 @@ class LeagueBot(discord.Client):
         print(f"🤖 Bot is online as: {self.user}")
         print(f"📊 Connected to {len(self.guilds)} guild(s)")
         print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        reserve_roster.reset()
         
         print("🔄 Syncing slash commands...")
         try:
@@ -815,6 +894,11 @@ class LeagueBot(discord.Client):
             race_reminder_task.start()
             print("✅ Started automated notification tasks")
 
+    async def close(self):
+        # Finish queued writes and write out batched database changes before disconnecting
+        await db.close()
+        await super().close()
+
     async def on_member_join(self, member):
         """Auto-assign role on join"""
         print(f"👤 New member joined: {member}")
@@ -837,6 +921,28 @@ class LeagueBot(discord.Client):
         else:
             print("⚠️ Auto-role 'Member' (or ID) not found in guild.")
 
+    async def on_member_update(self, before, after):
+        """Keep the cached reserve list in step with role changes"""
+        if before.roles != after.roles:
+            reserve_roster.member_updated(after)
+
+    async def on_member_remove(self, member):
+        reserve_roster.member_left(member)
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """A deleted standings/records board is re-posted on its next update"""
+        if not payload.guild_id:
+            return
+        attendance_renderer.forget(payload.message_id)
+        # Most deleted messages are not boards: rule them out without touching the database
+        board_ids = await _board_message_ids()
+        if str(payload.message_id) not in board_ids:
+            return
+        board_ids.discard(str(payload.message_id))
+        name = await db.forget_board_message(payload.message_id)
+        if name:
+            print(f"⚠️ {name} board message was deleted")
+
     async def on_interaction(self, interaction: discord.Interaction):
         """Global interaction listener for dynamic persistent buttons"""
         # Check if it's a component interaction (Button/Select)
@@ -858,7 +964,7 @@ class LeagueBot(discord.Client):
                         target_user = await guild.fetch_member(user_id)
                     
                     # Execute Logic (Same as old finish_btn)
-                    player = database.get_player(user_id)
+                    player = await db.get_player(user_id)
                     if not player:
                         await interaction.response.send_message("❌ Chyba: Data přihlášky nenalezena.", ephemeral=True)
                         return
@@ -903,7 +1009,7 @@ bot = LeagueBot()
 async def setup_attendance(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
     try:
-        database.reset_attendance() # Start fresh for new race
+        await db.reset_attendance() # Start fresh for new race
         embed = discord.Embed(
             title="🏁 Nadcházející závod: Registrace",
             description="Celkem přihlášeno: **0**",
@@ -1065,13 +1171,13 @@ async def send_info(interaction: discord.Interaction):
 @bot.tree.command(name="rc-hraci", description="Zobrazit seznam registrovaných hráčů")
 async def list_players(interaction: discord.Interaction):
     try:
-        players = database.get_all_players()
+        players = await db.get_all_players()
         if not players:
             await interaction.response.send_message("📭 Zatím žádné přihlášky.", ephemeral=True)
             return
         embed = discord.Embed(title="📋 Seznam přihlášek", color=config.EMBED_COLOR_PRIMARY)
         for role in config.LEAGUE_ROLES:
-            role_players = database.get_players_by_role(role["value"])
+            role_players = await db.get_players_by_role(role["value"])
             if role_players:
                 player_list = "\n".join([f"• {p['username']}" for p in role_players])
                 embed.add_field(name=f"{role['name']} ({len(role_players)})", value=player_list[:1024], inline=False)
@@ -1085,7 +1191,7 @@ async def list_players(interaction: discord.Interaction):
 @bot.tree.command(name="rc-profil", description="Zobrazit detaily tvé přihlášky")
 async def my_profile(interaction: discord.Interaction):
     try:
-        player = database.get_player(interaction.user.id)
+        player = await db.get_player(interaction.user.id)
         if not player:
             await interaction.response.send_message("❌ Žádná přihláška nenalezena.", ephemeral=True)
             return
@@ -1095,6 +1201,23 @@ async def my_profile(interaction: discord.Interaction):
         embed.add_field(name="Role", value=player["role"].title(), inline=True)
         for k, v in ans.items():
             embed.add_field(name=k.replace('_', ' ').title(), value=v, inline=False)
+        
+        # Driver statistics (cached, recomputed only after new results)
+        stats = await db.get_driver_stats(interaction.user.id) if player["role"] == "driver" else {}
+        if stats.get("total_races"):
+            delta = stats["average_grid_delta"]
+            embed.add_field(name="🏁 Závody", value=f"{stats['total_races']} (výhry {stats['wins']}, pódia {stats['podiums']})", inline=True)
+            embed.add_field(name="📊 Body / závod", value=f"{stats['points_per_race']:.1f}", inline=True)
+            embed.add_field(name="❌ DNF", value=f"{stats['dnf_rate']:.0%}", inline=True)
+            embed.add_field(name="📍 Prům. pozice", value=f"{stats['average_position']:.1f} (nejlepší P{stats['best_finish']})", inline=True)
+            if delta is not None:
+                embed.add_field(name="🚦 Start → cíl", value=f"{delta:+.1f} míst", inline=True)
+            embed.add_field(
+                name=f"🔥 Forma (posl. {len(stats['form'])})",
+                value=" ".join(f"P{p}" if p != "DNF" else "DNF" for p in stats["form"])
+                + f" · {stats['form_points_per_race']:.1f} b/závod",
+                inline=False
+            )
         await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
         if not interaction.response.is_done():
@@ -1103,7 +1226,7 @@ async def my_profile(interaction: discord.Interaction):
 @bot.tree.command(name="rc-unregister", description="Stáhnout svou přihlášku")
 async def unregister(interaction: discord.Interaction):
     try:
-        if database.unregister_player(interaction.user.id):
+        if await db.unregister_player(interaction.user.id):
             await interaction.response.send_message("👋 Přihláška stažena.", ephemeral=True)
         else:
             await interaction.response.send_message("❌ Žádná přihláška nenalezena.", ephemeral=True)
@@ -1116,7 +1239,7 @@ async def unregister(interaction: discord.Interaction):
 @app_commands.describe(uzivatel="Hráč k vyhledání")
 async def search_player(interaction: discord.Interaction, uzivatel: discord.Member):
     try:
-        player = database.get_player(uzivatel.id)
+        player = await db.get_player(uzivatel.id)
         if not player:
             await interaction.response.send_message(f"❌ Hráč {uzivatel.mention} nemá žádnou přihlášku.", ephemeral=True)
             return
@@ -1153,8 +1276,8 @@ async def search_player(interaction: discord.Interaction, uzivatel: discord.Memb
 @app_commands.describe(jezdec="Jezdec k zobrazení")
 async def penalty_info(interaction: discord.Interaction, jezdec: discord.Member):
     try:
-        total = database.get_penalty_points(jezdec.id)
-        history = database.get_penalty_history(jezdec.id)
+        total = await db.get_penalty_points(jezdec.id)
+        history = await db.get_penalty_history(jezdec.id)
         
         embed = discord.Embed(
             title=f"⚠️ Trestné body: {jezdec.display_name}",
@@ -1183,7 +1306,7 @@ async def penalty_info(interaction: discord.Interaction, jezdec: discord.Member)
 @app_commands.default_permissions(administrator=True)
 @app_commands.describe(jezdec="Jezdec k resetování")
 async def penalty_reset(interaction: discord.Interaction, jezdec: discord.Member):
-    if database.reset_penalty_points(jezdec.id):
+    if await db.reset_penalty_points(jezdec.id):
         await interaction.response.send_message(f"✅ Trestné body pro {jezdec.mention} byly resetovány!", ephemeral=True)
     else:
         await interaction.response.send_message(f"❌ Hráč {jezdec.mention} nenalezen v databázi.", ephemeral=True)
@@ -1199,7 +1322,7 @@ async def generate_lineup(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
     
     try:
-        lineup = database.get_race_lineup()
+        lineup = await db.get_race_lineup()
         
         if not lineup:
             await interaction.followup.send("📭 Žádní jezdci nejsou přihlášeni na závod.")
@@ -1235,7 +1358,7 @@ async def export_db(interaction: discord.Interaction):
     await interaction.response.defer(ephemeral=True)
     
     try:
-        csv_string = database.export_to_csv_string()
+        csv_string = await db.export_to_csv_string()
         if not csv_string:
             await interaction.followup.send("📭 Databáze je prázdná.")
             return
@@ -1258,7 +1381,7 @@ class RaceResultsModal(Modal):
     race_name = TextInput(label="Název závodu", placeholder="Bahrain GP", required=True)
     results = TextInput(
         label="Pořadí (mentions, řádek po řádku)",
-        placeholder="@User1\n@User2\n@User3",
+        placeholder="@User1\n@User2\n@User3 DNF",
         style=discord.TextStyle.paragraph,
         required=True
     )
@@ -1270,46 +1393,48 @@ class RaceResultsModal(Modal):
         try:
             # Parse results
             lines = self.results.value.strip().split('\n')
-            participant_ids = []
-            results_summary = []
+            ordered_ids = []
+            dnf_ids = []
             
-            for position, line in enumerate(lines, 1):
+            for line in lines:
                 line = line.strip()
-                if not line:
-                    continue
+                user_id = None
+                
+                # "@User DNF" = retired, keeps the position but scores nothing
+                is_dnf = line.upper().endswith("DNF")
+                if is_dnf:
+                    line = line[:-3].strip()
                 
                 # Extract user ID from mention
                 if line.startswith("<@") and line.endswith(">"):
                     user_id_str = line.replace("<@!", "").replace("<@", "").replace(">", "")
                     try:
                         user_id = int(user_id_str)
-                        participant_ids.append(user_id)
-                        
-                        # Check if this driver gets the fastest lap bonus
-                        is_fastest = False
-                        if self.fastest_lap_driver.value:
-                            fl_mention = self.fastest_lap_driver.value.strip()
-                            if fl_mention == line:
-                                is_fastest = True
-                        
-                        # Add race result
-                        result = database.add_race_result(
-                            user_id=user_id,
-                            race_name=self.race_name.value,
-                            position=position,
-                            fastest_lap=is_fastest
-                        )
-                        
-                        if result["success"]:
-                            results_summary.append(
-                                f"{position}. <@{user_id}> - {result['points_awarded']} bodů"
-                                + (" 🏁" if is_fastest else "")
-                            )
                     except ValueError:
-                        continue
+                        pass
+                
+                # Lines without a valid mention still take up their position
+                ordered_ids.append(user_id)
+                if is_dnf and user_id is not None:
+                    dnf_ids.append(user_id)
             
-            # MODULE 6: Track attendance
-            database.track_race_attendance(self.race_name.value, participant_ids)
+            # Fastest lap driver (optional)
+            fastest_lap_id = None
+            fl_mention = self.fastest_lap_driver.value.strip() if self.fastest_lap_driver.value else ""
+            if fl_mention.startswith("<@") and fl_mention.endswith(">"):
+                try:
+                    fastest_lap_id = int(fl_mention.replace("<@!", "").replace("<@", "").replace(">", ""))
+                except ValueError:
+                    pass
+            
+            # Results, points and attendance (MODULE 6) in one atomic write
+            bulk = await db.add_race_results_bulk(self.race_name.value, ordered_ids, fastest_lap_id, dnf_ids)
+            results_summary = [
+                f"{r['position']}. <@{r['user_id']}> - {r['points_awarded']} bodů"
+                + (" 🏁" if r["fastest_lap"] else "")
+                + (" ❌ DNF" if r["dnf"] else "")
+                for r in bulk["results"]
+            ]
             
             # Send confirmation
             embed = discord.Embed(
@@ -1331,7 +1456,7 @@ class RaceResultsModal(Modal):
 async def update_standings_embed(bot, guild):
     """Update or create the championship standings embed"""
     try:
-        standings = database.get_championship_standings()
+        standings = await db.get_championship_standings(limit=20)
         if not standings:
             return
         
@@ -1342,7 +1467,7 @@ async def update_standings_embed(bot, guild):
             timestamp=discord.utils.utcnow()
         )
         
-        for i, entry in enumerate(standings[:20], 1):
+        for i, entry in enumerate(standings, 1):
             prefix = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"**{i}.**"
             embed.add_field(
                 name=f"{prefix} {entry['username']}",
@@ -1352,18 +1477,66 @@ async def update_standings_embed(bot, guild):
         
         embed.set_footer(text="Race Control | Championship Standings")
         
-        # Try to edit existing message or create new one
-        channel = bot.get_channel(int(config.STANDINGS_CHANNEL_ID))
-        if not channel:
-            channel = await bot.fetch_channel(int(config.STANDINGS_CHANNEL_ID))
-        
-        # For simplicity, just send a new message (you could store message ID in database)
-        await channel.send(embed=embed)
+        await publish_board(bot, "standings", int(config.STANDINGS_CHANNEL_ID), embed,
+                            fallback_message_id=config.STANDINGS_MESSAGE_ID)
         
     except Exception as e:
         print(f"❌ Error updating standings: {e}")
 
 
+BOARDS = ("standings", "constructors", "records")  # live board messages, see publish_board()
+_board_ids = None  # message ids (str) of the live boards; loaded on first use, then kept by publish_board()
+
+
+async def _board_message_ids() -> set:
+    global _board_ids
+    if _board_ids is None:
+        saved = [await db.get_board_message(name) for name in BOARDS]
+        _board_ids = {board["message_id"] for board in saved if board}
+    return _board_ids
+
+
+def _embed_digest(embed: discord.Embed) -> str:
+    """Hash of what an embed shows (its render timestamp left out)"""
+    content = embed.to_dict()
+    content.pop("timestamp", None)
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+async def publish_board(bot, name: str, channel_id: int, embed: discord.Embed, fallback_message_id=None):
+    """
+    Keep one live message per board ("standings", "constructors", "records"):
+    edit it in place, skip the edit when nothing changed, post a new one if
+    the saved message is gone. The message ID is stored in the database.
+    """
+    digest = _embed_digest(embed)
+    saved = await db.get_board_message(name)
+    if saved and saved["channel_id"] != str(channel_id):
+        saved = None  # board moved to another channel
+    if saved and saved["digest"] == digest:
+        return
+    message_id = int(saved["message_id"]) if saved else int(fallback_message_id or 0)
+
+    channel = bot.get_channel(channel_id)
+    if not channel:
+        channel = await bot.fetch_channel(channel_id)
+
+    board_ids = await _board_message_ids()
+    if message_id:
+        try:
+            message = await channel.get_partial_message(message_id).edit(embed=embed)
+            await db.save_board_message(name, channel_id, message.id, digest)
+            board_ids.add(str(message.id))
+            return
+        except discord.NotFound:
+            print(f"⚠️ {name} board message {message_id} was deleted, posting a new one")
+            board_ids.discard(str(message_id))
+
+    message = await channel.send(embed=embed)
+    await db.save_board_message(name, channel_id, message.id, digest)
+    board_ids.add(str(message.id))
+
+
 @bot.tree.command(name="rc-add-results", description="Zadat výsledky závodu (Admin)")
 @app_commands.default_permissions(administrator=True)
 async def add_race_results(interaction: discord.Interaction):
@@ -1373,7 +1546,7 @@ async def add_race_results(interaction: discord.Interaction):
 @bot.tree.command(name="rc-standings", description="Zobrazit aktuální standings šampionátu")
 async def show_standings(interaction: discord.Interaction):
     try:
-        standings = database.get_championship_standings()
+        standings = await db.get_championship_standings(limit=10)
         if not standings:
             await interaction.response.send_message("📭 Zatím žádné výsledky.", ephemeral=True)
             return
@@ -1384,7 +1557,7 @@ async def show_standings(interaction: discord.Interaction):
             timestamp=discord.utils.utcnow()
         )
         
-        for i, entry in enumerate(standings[:10], 1):
+        for i, entry in enumerate(standings, 1):
             prefix = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"**{i}.**"
             embed.add_field(
                 name=f"{prefix} {entry['username']}",
@@ -1405,7 +1578,7 @@ async def show_standings(interaction: discord.Interaction):
 @app_commands.default_permissions(administrator=True)
 async def check_activity(interaction: discord.Interaction):
     try:
-        inactive = database.get_inactive_users()
+        inactive = await db.get_inactive_users()
         
         if not inactive:
             await interaction.response.send_message("✅ Všichni členové jsou aktivní!", ephemeral=True)
@@ -1478,6 +1651,48 @@ async def set_next_race(interaction: discord.Interaction, nazev: str, datum: str
 # MODULE 10: NOTIFICATION HUB (Automated Notifications)
 # ═══════════════════════════════════════════════════════════════
 
+class NotificationDispatcher:
+    """
+    Sends one DM to many users at once. Users come from the client cache
+    when possible; at most `concurrency` sends run together and discord.py
+    queues each request on its rate-limit bucket. Every user ends with an
+    outcome: sent, forbidden (DMs closed), not_found or failed.
+    """
+    def __init__(self, client: discord.Client, concurrency: int, retries: int):
+        self.client = client
+        self.concurrency = concurrency
+        self.retries = retries
+
+    async def _deliver(self, user_id: int, content: str, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    user = self.client.get_user(user_id) or await self.client.fetch_user(user_id)
+                    await user.send(content)
+                    return "sent"
+                except discord.Forbidden:
+                    return "forbidden"
+                except discord.NotFound:
+                    return "not_found"
+                except discord.RateLimited as e:
+                    await asyncio.sleep(e.retry_after)
+                except discord.HTTPException as e:
+                    if e.status < 500:
+                        return "failed"
+                    await asyncio.sleep(2 ** attempt)
+            return "failed"
+
+    async def send(self, user_ids: list, content: str) -> dict:
+        """DM everyone in user_ids; returns {user id: outcome}"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._deliver(uid, content, semaphore) for uid in user_ids),
+                                       return_exceptions=True)
+        return {uid: r if isinstance(r, str) else "failed" for uid, r in zip(user_ids, results)}
+
+
+notifier = NotificationDispatcher(bot, config.DM_CONCURRENCY, config.DM_RETRIES)
+
+
 @tasks.loop(hours=1)  # Check every hour
 async def race_reminder_task():
     """Send reminders to 'Maybe' users 24 hours before race"""
@@ -1491,20 +1706,27 @@ async def race_reminder_task():
         
         # Check if we're between 24-23 hours before race
         if 82800 <= time_until_race <= 86400:  # 23-24 hours in seconds
-            attendance = database.get_attendance()
+            by_status = await db.get_attendance_by_status()
             
-            for user_id_str, entry in attendance.items():
-                if entry.get('status') == 'Maybe':
-                    try:
-                        user = await bot.fetch_user(int(user_id_str))
-                        await user.send(
-                            f"🏁 **Připomínka závodu!**\n\n"
-                            f"Závod začíná <t:{config.NEXT_RACE_TIMESTAMP}:R>!\n"
-                            f"Prosím rozhodň se, zda se zúčastníš nebo ne. 🏎️"
-                        )
-                        print(f"✅ Sent race reminder to {user}")
-                    except:
-                        pass  # DM failed or user not found
+            # One reminder per race: skip users already reached (or unreachable) in an earlier run
+            key = f"race_reminder:{config.NEXT_RACE_TIMESTAMP}"
+            done = await db.get_notification_outcomes(key)
+            pending = [int(uid) for uid in by_status.get("Maybe", []) if done.get(uid, "failed") == "failed"]
+            if not pending:
+                return
+            
+            outcomes = await notifier.send(pending, (
+                f"🏁 **Připomínka závodu!**\n\n"
+                f"Závod začíná <t:{config.NEXT_RACE_TIMESTAMP}:R>!\n"
+                f"Prosím rozhodň se, zda se zúčastníš nebo ne. 🏎️"
+            ))
+            await db.record_notification_outcomes(key, outcomes)
+            
+            sent = sum(1 for outcome in outcomes.values() if outcome == "sent")
+            print(f"✅ Sent race reminder to {sent}/{len(outcomes)} user(s)")
+            for user_id, outcome in outcomes.items():
+                if outcome != "sent":
+                    print(f"⚠️ Race reminder to {user_id}: {outcome}")
         
     except Exception as e:
         print(f"❌ Error in race_reminder_task: {e}")
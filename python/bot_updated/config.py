@@ -48,6 +48,19 @@ ROLE_ADMIN_ID = os.getenv("ROLE_ADMIN_ID")
 ROLE_UNDER_REVIEW = os.getenv("ROLE_UNDER_REVIEW")
 ROLE_UNDER_TESTING = os.getenv("ROLE_UNDER_TESTING")
 
+# ═══════════════════════════════════════════════════════════════
+# DATABASE
+# ═══════════════════════════════════════════════════════════════
+DATABASE_BACKEND = "json"  # Úložiště dat: "json" (players.json) nebo "sqlite"
+SQLITE_DATABASE_FILE = "players.db"  # Soubor SQLite databáze
+DATABASE_FLUSH_INTERVAL = 30  # Po kolika sekundách se uloží celý soubor (změny jdou hned do žurnálu; 0 = okamžitě)
+DATABASE_POLL_INTERVAL = 2  # Jak často (s) kontrolovat změny od jiných procesů (ostatní boti, web)
+DATABASE_READ_WORKERS = 4  # Počet vláken pro čtení z databáze (zápisy jdou vždy jedním vláknem)
+DATABASE_PRETTY_JSON = False  # True = odsazený players.json (čitelnější, ale pomalejší a větší); export je vždy odsazený
+HISTORY_DIR = "history"  # Složka (v data/) s historií závodů, kvalifikací a trestů (jeden podadresář na sezónu)
+CURRENT_SEASON = "2026"  # Aktuální sezóna – nové výsledky se zapisují do její historie
+RACES_DIR = "races"  # Archiv závodů (v data/): jeden soubor YYYY-MM-DD_okruh.json na závod + index sezóny
+
 # ═══════════════════════════════════════════════════════════════
 # MODULE 1: PENALTY SYSTEM
 # ═══════════════════════════════════════════════════════════════
@@ -60,6 +73,8 @@ ROLE_BANNED_DRIVER = "1465093640677363775"  # Role pro zabanované jezdce
 # ═══════════════════════════════════════════════════════════════
 ROLE_RESERVE = "1465093808612970527"  # Role ID pro náhradníky
 MAX_MAIN_GRID_SIZE = 20  # Maximální kapacita hlavního gridu
+ATTENDANCE_RENDER_WINDOW = 2.0  # Tabulka docházky se upraví max. jednou za N s (kliky mezitím se sloučí)
+ATTENDANCE_RENDER_MAX_BACKOFF = 60  # Max. čekání (s) po rate limitu Discordu před další úpravou tabulky
 
 # ═══════════════════════════════════════════════════════════════
 # MODULE 5: RACE RESULTS & STANDINGS
@@ -67,7 +82,8 @@ MAX_MAIN_GRID_SIZE = 20  # Maximální kapacita hlavního gridu
 POINTS_SYSTEM = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]  # Body pro pozice 1-10
 FASTEST_LAP_BONUS = 1  # Extra bod za nejrychlejší kolo
 FASTEST_LAP_MIN_POSITION = 10  # Fastest lap bonus pouze pokud dojede v top 10
-STANDINGS_MESSAGE_ID = None  # ID standings embedu (bot automaticky uloží)
+STATS_FORM_RACES = 5  # Forma jezdce ve statistikách = posledních N závodů
+STANDINGS_MESSAGE_ID = None  # Volitelně ID už existujícího standings embedu (jinak ho bot pošle a ID uloží do databáze)
 
 # ═══════════════════════════════════════════════════════════════
 # MODULE 6: ACTIVITY TRACKING
@@ -83,6 +99,12 @@ NEXT_RACE_TIMESTAMP = None  # Unix timestamp (nastavíš přes /rc-set-next-race
 RACE_DAY_DEFAULT = "Sobota"  # Default den závodu
 RACE_TIME_DEFAULT = "18:00"  # Default čas závodu
 
+# ═══════════════════════════════════════════════════════════════
+# MODULE 10: NOTIFICATION HUB
+# ═══════════════════════════════════════════════════════════════
+DM_CONCURRENCY = 5  # Kolik DM se posílá současně (rate limity hlídá discord.py)
+DM_RETRIES = 2  # Počet opakování DM po rate limitu nebo chybě serveru Discordu
+
 # League roles for the dropdown
 LEAGUE_ROLES = [
     {"name": "⚖️ Steward", "value": "steward", "description": "Rozhodování incidentů a kontrola pravidel"},
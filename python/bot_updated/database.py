@@ -1,48 +1,224 @@
 """
 Simple JSON-based database for storing player registrations
 """
-import json
+import bisect
+import copy
 import os
+import uuid
 from datetime import datetime
 from typing import Optional
+import codec
 import config
+from storage import DatabaseStore, RecordIndex, RecordView, atomic_write_text
+from storage import SnapshotUnavailable  # noqa: F401 (raised by snapshot_call, caught by async_database)
+from sqlite_backend import SqliteBackend
+from history import HistoryLog
+from race_archive import RaceArchive
+from models import Player
 
+# Path to shared data directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(BASE_DIR, "data")
 DATABASE_FILE = "players.json"
+SQLITE_DATABASE_FILE = config.SQLITE_DATABASE_FILE
+HISTORY_DIR = os.path.join(DATA_DIR, config.HISTORY_DIR)
+RACES_DIR = os.path.join(DATA_DIR, config.RACES_DIR)
 
-
-def load_database() -> dict:
-    """Load the player database from JSON file"""
+def _read_database_file() -> dict:
+    """Read the player database from the JSON file on disk"""
     if os.path.exists(DATABASE_FILE):
         try:
-            with open(DATABASE_FILE, "r", encoding="utf-8") as f:
-                db = json.load(f)
-                if not isinstance(db, dict): db = {}
-                if "players" not in db: db["players"] = {}
-                if "attendance" not in db: db["attendance"] = {}
-                if "races_history" not in db: db["races_history"] = []  # MODULE 6
-                return db
-        except (json.JSONDecodeError, Exception):
-            print(f"⚠️ Warning: Corrupted database file. Resetting...")
+            db = codec.load_file(DATABASE_FILE)
+            if not isinstance(db, dict): db = {}
+            if "players" not in db: db["players"] = {}
+            if "attendance" not in db: db["attendance"] = {}
+            if "races_history" not in db: db["races_history"] = []  # MODULE 6
+            return db
+        except (ValueError, Exception):
+            # Keep the damaged file for manual recovery instead of overwriting it
+            backup = f"{DATABASE_FILE}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            try:
+                os.replace(DATABASE_FILE, backup)
+            except OSError:
+                backup = DATABASE_FILE
+            print(f"⚠️ Warning: Corrupted database file (kept as {backup}). Resetting...")
             return {"players": {}, "attendance": {}, "races_history": []}
     return {"players": {}, "attendance": {}, "races_history": []}
 
 
+def _write_database_file(data: dict) -> None:
+    """Write the player database to the JSON file on disk (atomically)"""
+    atomic_write_text(DATABASE_FILE, codec.dumps(data, pretty=config.DATABASE_PRETTY_JSON))
+
+
+# Optional SQLite storage (config.DATABASE_BACKEND = "sqlite")
+_sqlite = SqliteBackend(SQLITE_DATABASE_FILE) if config.DATABASE_BACKEND == "sqlite" else None
+
+# Resident copy of the database. Every change is journaled immediately and the
+# full database is checkpointed in batches. Writers lock the data file so other
+# bot processes sharing it don't lose each other's updates.
+if _sqlite:
+    _store = DatabaseStore(_sqlite.load, _sqlite.save, config.DATABASE_FLUSH_INTERVAL,
+                           journal_path=SQLITE_DATABASE_FILE + ".journal",
+                           data_path=SQLITE_DATABASE_FILE, poll_interval=config.DATABASE_POLL_INTERVAL)
+else:
+    _store = DatabaseStore(_read_database_file, _write_database_file, config.DATABASE_FLUSH_INTERVAL,
+                           journal_path=DATABASE_FILE + ".journal",
+                           data_path=DATABASE_FILE, poll_interval=config.DATABASE_POLL_INTERVAL)
+
+
+def _normalize_ea_id(ea_id) -> Optional[str]:
+    """EA IDs are matched case-insensitively, ignoring surrounding spaces"""
+    if not isinstance(ea_id, str) or not ea_id.strip():
+        return None
+    return ea_id.strip().casefold()
+
+
+# Secondary indexes, kept in step with every change by the store
+_players_index = RecordIndex(
+    "players",
+    role=lambda p: p.get("role"),
+    ea_id=lambda p: _normalize_ea_id((p.get("answers") or {}).get("ea_id")),
+    missed_races=lambda p: p.get("missed_races", 0) if p.get("role") == "driver" else None
+)
+_attendance_index = RecordIndex("attendance", status=lambda entry: entry.get("status"))
+_store.add_index(_players_index)
+_store.add_index(_attendance_index)
+
+# Typed, slotted copies of the player records for loops over many players
+_player_view = RecordView("players", Player.from_dict)
+_store.add_index(_player_view)
+
+# Race, qualifying and penalty history, appended per season outside the database;
+# player records only carry the aggregates
+_history = HistoryLog(HISTORY_DIR, config.CURRENT_SEASON)
+_archive = RaceArchive(RACES_DIR)
+
+
+def _write_history(items: list, seq: int, replay: bool) -> None:
+    _history.write_journaled(items, seq, replay)
+
+
+def _write_archive(items: list, seq: int, replay: bool) -> None:
+    for metadata, rows in items:
+        try:
+            filename = _archive.write_race(metadata, rows)
+        except ValueError as e:
+            # Retrying won't help (e.g. a race name with nothing usable for a file name)
+            print(f"⚠️ Race not archived: {e}")
+            continue
+        if not replay:
+            print(f"🗄️ Race archived as {filename}")
+
+
+# History entries and archived races are journaled with the change that adds them (tx.write_log)
+_store.add_log("history", _write_history)
+_store.add_log("archive", _write_archive)
+
+
+def _add_history(tx, kind: str, user_id_str: str, entry: dict) -> None:
+    """Add a history entry as part of `tx` (written to the season segment on commit)"""
+    tx.write_log("history", [kind, _history.season, user_id_str, entry])
+
+
+def _all_seasons(kind: str, user_id_str: str) -> list:
+    """A player's history entries of a kind from every season, oldest first (typed records)"""
+    return [entry for season in _history.seasons() for entry in _history.records(kind, user_id_str, season)]
+
+
+def load_database() -> dict:
+    """Get the player database (served from memory, read from disk only once)"""
+    return _store.data
+
+
 def save_database(data: dict) -> None:
-    """Save the player database to JSON file"""
-    with open(DATABASE_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Replace the whole player database (journaled) and checkpoint it to disk right away"""
+    with _store.transaction("save_database") as tx:
+        tx.put_document(data)
+        # Player records may have been edited directly; standings are rebuilt on next read
+        tx.delete("standings")
+    _store.flush()
 
 
-def initialize_player_structure(player_data: dict) -> dict:
-    """Ensure player has all required fields for new modules"""
-    defaults = {
+def transaction(op: str):
+    """
+    Group several changes into one atomic, journaled unit of work:
+
+        with database.transaction("my_change") as tx:
+            player = tx.touch("players", user_id_str)
+            player["team"] = "ferrari"
+    """
+    return _store.transaction(op)
+
+
+def refresh_database() -> bool:
+    """Pick up changes other processes made to the database (a cheap stat when nothing changed)"""
+    return _store.refresh_if_changed(force=True)
+
+
+def get_database_generation() -> int:
+    """Generation stamp of the database files, increased by every write from any process"""
+    return _store.generation
+
+
+def flush_database() -> None:
+    """Checkpoint any pending changes to disk immediately"""
+    _store.flush()
+
+
+def close_database() -> None:
+    """Flush pending changes and stop the background writer (call on shutdown)"""
+    _store.close()
+
+
+def snapshot_call(fn, *args, **kwargs):
+    """
+    Run a query on the latest committed snapshot, without the database lock,
+    and return a private deep copy of its result. Raises SnapshotUnavailable
+    when it has to go through locked_call() instead (the snapshot is behind
+    another process, or the query would rebuild stored data such as standings).
+    """
+    with _store.reading():
+        result = fn(*args, **kwargs)
+    return copy.deepcopy(result)
+
+
+def locked_call(fn, *args, **kwargs):
+    """Call `fn` while holding the database lock and return a private deep copy of its result"""
+    with _store.lock:
+        _store.refresh_if_changed(force=True)
+        return copy.deepcopy(fn(*args, **kwargs))
+
+
+# Orders derived from snapshot data by queries in snapshot_call(): name -> (standings
+# token, value). Entries are replaced, never changed, so reader threads share them.
+_reader_memo = {}
+
+
+def _memo(name: str, token: str, build):
+    cached = _reader_memo.get(name)
+    if cached is None or cached[0] != token:
+        cached = (token, build())
+        _reader_memo[name] = cached
+    return cached[1]
+
+
+def _player_defaults(player_data: dict) -> dict:
+    return {
         "total_points": 0,  # MODULE 5
-        "championship_history": [],  # MODULE 5
-        "penalties": {"total_points": 0, "history": []},  # MODULE 1
-        "last_activity": datetime.now().isoformat(),  # MODULE 6
+        "races_completed": 0,  # MODULE 5
+        "wins": 0,  # MODULE 5
+        "podiums": 0,  # MODULE 5
+        "fastest_laps": 0,  # MODULE 5
+        "penalties": {"total_points": 0},  # MODULE 1
+        "last_activity": player_data.get("registered_at") or datetime.now().isoformat(),  # MODULE 6
         "missed_races": 0,  # MODULE 6
     }
-    for key, value in defaults.items():
+
+
+def initialize_player_structure(player_data: dict) -> dict:
+    """Fill in the fields every player record must have (for new records and migrations)"""
+    for key, value in _player_defaults(player_data).items():
         if key not in player_data:
             player_data[key] = value
     return player_data
@@ -55,24 +231,24 @@ def register_player(user_id: int, username: str, role: str, answers: dict = None
     Returns:
         dict with 'success', 'message', and 'is_update' keys
     """
-    db = load_database()
     user_id_str = str(user_id)
     
-    is_update = user_id_str in db["players"]
-    
-    player_data = {
-        "username": username,
-        "role": role,
-        "answers": answers or {},
-        "registered_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat() if is_update else None
-    }
-    
-    # Initialize with new module fields
-    player_data = initialize_player_structure(player_data)
-    
-    db["players"][user_id_str] = player_data
-    save_database(db)
+    with _store.transaction("register_player") as tx:
+        is_update = user_id_str in tx.data["players"]
+        
+        player_data = {
+            "username": username,
+            "role": role,
+            "answers": answers or {},
+            "registered_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat() if is_update else None
+        }
+        
+        # Initialize with new module fields
+        player_data = initialize_player_structure(player_data)
+        
+        tx.put("players", user_id_str, player_data)
+        _update_standings(tx, user_id_str)
     
     return {
         "success": True,
@@ -84,56 +260,66 @@ def register_player(user_id: int, username: str, role: str, answers: dict = None
 def get_player(user_id: int) -> Optional[dict]:
     """Get player data by user ID"""
     db = load_database()
-    player = db["players"].get(str(user_id))
-    if player:
-        # Ensure structure is up-to-date
-        player = initialize_player_structure(player)
-    return player
+    return db["players"].get(str(user_id))
 
 
 def get_all_players() -> dict:
     """Get all registered players"""
     db = load_database()
-    # Ensure all players have correct structure
-    for uid in db["players"]:
-        db["players"][uid] = initialize_player_structure(db["players"][uid])
     return db["players"]
 
 
 def get_players_by_role(role: str) -> list:
     """Get all players in a specific role"""
-    db = load_database()
-    return [
-        {"user_id": uid, **initialize_player_structure(data)}
-        for uid, data in db["players"].items()
-        if data["role"] == role
-    ]
+    with _store.lock:
+        players = load_database()["players"]
+        return [
+            {"user_id": uid, **players[uid]}
+            for uid in _store.sync_index(_players_index).get("role", role)
+        ]
+
+
+def get_player_by_ea_id(ea_id: str) -> Optional[dict]:
+    """Find the player registered with an EA ID (None if nobody is)"""
+    key = _normalize_ea_id(ea_id)
+    if key is None:
+        return None
+    
+    with _store.lock:
+        user_ids = _store.sync_index(_players_index).get("ea_id", key)
+        if not user_ids:
+            return None
+        return {"user_id": user_ids[0], **load_database()["players"][user_ids[0]]}
 
 
 def unregister_player(user_id: int) -> bool:
     """Remove a player from the database"""
-    db = load_database()
     user_id_str = str(user_id)
     
-    if user_id_str in db["players"]:
-        del db["players"][user_id_str]
-        save_database(db)
-        return True
+    with _store.transaction("unregister_player") as tx:
+        if user_id_str in tx.data["players"]:
+            tx.delete("players", user_id_str)
+            _update_standings(tx, user_id_str)
+            return True
     return False
 
 
 def update_attendance(user_id: int, username: str, status: str) -> None:
     """Update attendance status for a user for current race"""
-    db = load_database()
-    db["attendance"][str(user_id)] = {
-        "username": username,
-        "status": status,
-        "updated_at": datetime.now().isoformat()
-    }
-    save_database(db)
-    
-    # MODULE 6: Update last activity
-    update_last_activity(user_id)
+    with _store.transaction("update_attendance") as tx:
+        user_id_str = str(user_id)
+        previous = tx.data["attendance"].get(user_id_str)
+        if previous and previous.get("status") != status:
+            # A changed answer goes to the back of its new list, on disk as in the index
+            tx.delete("attendance", user_id_str)
+        tx.put("attendance", user_id_str, {
+            "username": username,
+            "status": status,
+            "updated_at": datetime.now().isoformat()
+        })
+        
+        # MODULE 6: Update last activity
+        update_last_activity(user_id)
 
 
 def get_attendance() -> dict:
@@ -142,11 +328,16 @@ def get_attendance() -> dict:
     return db["attendance"]
 
 
+def get_attendance_by_status() -> dict:
+    """Attendance grouped by status: {status: [user ids in signup order]}"""
+    index = _store.sync_index(_attendance_index)
+    return {status: index.get("status", status) for status in index.keys("status")}
+
+
 def reset_attendance() -> None:
     """Clear attendance for a new race"""
-    db = load_database()
-    db["attendance"] = {}
-    save_database(db)
+    with _store.transaction("reset_attendance") as tx:
+        tx.put("attendance", {})
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -155,26 +346,23 @@ def reset_attendance() -> None:
 
 def add_penalty_points(user_id: int, points: int, reason: str, incident_id: str = None) -> dict:
     """Add penalty points to a player"""
-    db = load_database()
     user_id_str = str(user_id)
     
-    if user_id_str not in db["players"]:
-        return {"success": False, "message": "Player not found"}
-    
-    player = initialize_player_structure(db["players"][user_id_str])
-    
-    # Add to history
-    penalty_entry = {
-        "date": datetime.now().isoformat(),
-        "points": points,
-        "reason": reason,
-        "incident_id": incident_id
-    }
-    player["penalties"]["history"].append(penalty_entry)
-    player["penalties"]["total_points"] += points
-    
-    db["players"][user_id_str] = player
-    save_database(db)
+    with _store.transaction("add_penalty_points") as tx:
+        if user_id_str not in tx.data["players"]:
+            return {"success": False, "message": "Player not found"}
+        
+        player = tx.touch("players", user_id_str)
+        
+        # Add to history
+        penalty_entry = {
+            "date": datetime.now().isoformat(),
+            "points": points,
+            "reason": reason,
+            "incident_id": incident_id
+        }
+        _add_history(tx, "penalties", user_id_str, penalty_entry)
+        player["penalties"]["total_points"] += points
     
     total = player["penalties"]["total_points"]
     exceeded = total >= config.PENALTY_POINTS_LIMIT
@@ -195,26 +383,29 @@ def get_penalty_points(user_id: int) -> int:
 
 
 def get_penalty_history(user_id: int) -> list:
-    """Get penalty history for a player"""
-    player = get_player(user_id)
+    """Get penalty history for a player (all seasons, since the last reset)"""
+    with _store.lock:
+        player = _store.sync_index(_player_view).get(str(user_id))
     if not player:
         return []
-    return player.get("penalties", {}).get("history", [])
+    
+    reset_at = player.penalties_reset_at or ""
+    return [entry.to_dict() for entry in _all_seasons("penalties", player.user_id) if entry.date > reset_at]
 
 
 def reset_penalty_points(user_id: int) -> bool:
     """Reset penalty points for a player"""
-    db = load_database()
     user_id_str = str(user_id)
     
-    if user_id_str not in db["players"]:
-        return False
-    
-    db["players"][user_id_str]["penalties"] = {
-        "total_points": 0,
-        "history": []
-    }
-    save_database(db)
+    with _store.transaction("reset_penalty_points") as tx:
+        if user_id_str not in tx.data["players"]:
+            return False
+        
+        # History is append-only; older entries are hidden by the reset timestamp
+        tx.put("players", user_id_str, "penalties", {
+            "total_points": 0,
+            "reset_at": datetime.now().isoformat()
+        })
     return True
 
 
@@ -224,14 +415,17 @@ def reset_penalty_points(user_id: int) -> bool:
 
 def get_race_lineup() -> list:
     """Get list of drivers registered for current race with their EA IDs"""
-    db = load_database()
     lineup = []
     
-    for user_id_str, attendance_data in db["attendance"].items():
-        if attendance_data.get("status") == "Driver":
+    with _store.lock:
+        db = load_database()
+        players = _store.sync_index(_player_view)
+        for user_id_str in _store.sync_index(_attendance_index).get("status", "Driver"):
+            attendance_data = db["attendance"][user_id_str]
+            
             # Get player data for EA ID
-            player = db["players"].get(user_id_str, {})
-            ea_id = player.get("answers", {}).get("ea_id", "N/A")
+            player = players.get(user_id_str)
+            ea_id = (player.ea_id if player else None) or "N/A"
             
             lineup.append({
                 "user_id": user_id_str,
@@ -247,38 +441,38 @@ def get_race_lineup() -> list:
 # MODULE 5: RACE RESULTS & STANDINGS
 # ═══════════════════════════════════════════════════════════════
 
-def add_race_result(user_id: int, race_name: str, position: int, fastest_lap: bool = False) -> dict:
-    """Add race result and calculate championship points"""
-    db = load_database()
+def add_race_result(user_id: int, race_name: str, position: int, fastest_lap: bool = False, dnf: bool = False) -> dict:
+    """Add race result and calculate championship points (a DNF scores nothing)"""
     user_id_str = str(user_id)
     
-    if user_id_str not in db["players"]:
-        return {"success": False, "message": "Player not found"}
-    
-    player = initialize_player_structure(db["players"][user_id_str])
-    
-    # Calculate points
-    points = 0
-    if 1 <= position <= len(config.POINTS_SYSTEM):
-        points = config.POINTS_SYSTEM[position - 1]
-    
-    # Add fastest lap bonus
-    if fastest_lap and position <= config.FASTEST_LAP_MIN_POSITION:
-        points += config.FASTEST_LAP_BONUS
-    
-    # Add to history
-    race_entry = {
-        "race_name": race_name,
-        "position": position,
-        "points": points,
-        "fastest_lap": fastest_lap,
-        "date": datetime.now().isoformat()
-    }
-    player["championship_history"].append(race_entry)
-    player["total_points"] += points
-    
-    db["players"][user_id_str] = player
-    save_database(db)
+    with _store.transaction("add_race_result") as tx:
+        if user_id_str not in tx.data["players"]:
+            return {"success": False, "message": "Player not found"}
+        
+        player = tx.touch("players", user_id_str)
+        
+        # Calculate points
+        if dnf:
+            fastest_lap = False
+        points = _race_points(position, fastest_lap, dnf)
+        
+        # Add to history
+        race_entry = {
+            "race_name": race_name,
+            "position": position,
+            "points": points,
+            "fastest_lap": fastest_lap,
+            "date": datetime.now().isoformat()
+        }
+        if dnf:
+            race_entry["dnf"] = True
+        _add_history(tx, "championship", user_id_str, race_entry)
+        player["total_points"] += points
+        player["races_completed"] += 1
+        player["wins"] += int(position == 1 and not dnf)
+        player["podiums"] += int(position <= 3 and not dnf)
+        player["fastest_laps"] += int(bool(fastest_lap))
+        _update_standings(tx, user_id_str)
     
     return {
         "success": True,
@@ -287,32 +481,335 @@ def add_race_result(user_id: int, race_name: str, position: int, fastest_lap: bo
     }
 
 
-def get_championship_standings() -> list:
-    """Get championship standings sorted by total points"""
-    db = load_database()
-    standings = []
+def add_race_results_bulk(race_name: str, ordered_ids: list, fastest_lap_id: int = None, dnf_ids=()) -> dict:
+    """Apply a whole race (results, points, attendance) as one atomic change"""
+    results = []
+    skipped = []
+    dnf_ids = set(dnf_ids)
     
-    for user_id, player in db["players"].items():
-        if player.get("role") == "driver":  # Only drivers in standings
-            player = initialize_player_structure(player)
-            standings.append({
+    with _store.transaction("add_race_results_bulk") as tx:
+        for position, user_id in enumerate(ordered_ids, 1):
+            if user_id is None:
+                continue  # empty grid slot
+            is_dnf = user_id in dnf_ids
+            is_fastest = fastest_lap_id is not None and user_id == fastest_lap_id and not is_dnf
+            result = add_race_result(user_id, race_name, position, is_fastest, is_dnf)
+            if not result["success"]:
+                skipped.append(user_id)
+                continue
+            results.append({
                 "user_id": user_id,
-                "username": player.get("username", "Unknown"),
-                "total_points": player.get("total_points", 0),
-                "races_completed": len(player.get("championship_history", []))
+                "position": position,
+                "fastest_lap": is_fastest,
+                "dnf": is_dnf,
+                "points_awarded": result["points_awarded"],
+                "new_total": result["new_total"]
             })
+        
+        track_race_attendance(race_name, [uid for uid in ordered_ids if uid is not None])
+        
+        players = _store.sync_index(_player_view)
+        rows = [_archive_row(players.get(str(r["user_id"])), r) for r in results]
+        if rows:
+            tx.write_log("archive", [_archive_metadata(race_name), rows])
+    
+    return {"success": True, "results": results, "skipped": skipped}
+
+
+def _archive_row(player: Player, result: dict) -> dict:
+    """One results row of an archived race"""
+    return {
+        "position": result["position"],
+        "name": player.username,
+        "team": player.team,
+        "time": "DNF" if result["dnf"] else None,
+        "fastest_lap": result["fastest_lap"],
+        "points": result["points_awarded"],
+        "user_id": str(result["user_id"])
+    }
+
+
+def _archive_metadata(race_name: str) -> dict:
+    """Archive metadata for a race entered now"""
+    now = datetime.now()
+    return {"date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M"),
+            "circuit": race_name, "type": "race", "season": config.CURRENT_SEASON, "race_name": race_name,
+            "race_id": uuid.uuid4().hex}
+
+
+def get_race_index(season: str = None) -> dict:
+    """Season race index (race list, checksums, per-driver aggregates) without loading any race"""
+    return _archive.index(season or config.CURRENT_SEASON)
+
+
+def get_archived_race(filename: str) -> Optional[dict]:
+    """One archived race ({"metadata", "results"}) by its file name from the index"""
+    try:
+        return _archive.race(filename)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load archived race {filename}: {e}")
+        return None
+
+
+def _standings_signature() -> dict:
+    """Scoring rules (and entry layout) the stored standings were built with"""
+    return {
+        "format": 2,
+        "points_system": list(config.POINTS_SYSTEM),
+        "fastest_lap_bonus": config.FASTEST_LAP_BONUS,
+        "fastest_lap_min_position": config.FASTEST_LAP_MIN_POSITION
+    }
+
+
+# Signature fields that decide how many points a result is worth
+_SCORING_FIELDS = ("points_system", "fastest_lap_bonus", "fastest_lap_min_position")
+
+
+def _race_points(position: int, fastest_lap: bool, dnf: bool, scoring: dict = None) -> int:
+    """Points for one result under `scoring` (a standings signature; the current rules by default)"""
+    scoring = scoring or _standings_signature()
+    if dnf:
+        return 0
+    points_system = scoring["points_system"]
+    points = points_system[position - 1] if 1 <= position <= len(points_system) else 0
+    if fastest_lap and position <= scoring["fastest_lap_min_position"]:
+        points += scoring["fastest_lap_bonus"]
+    return points
+
+
+def _rescore_players(tx, previous: dict) -> None:
+    """
+    The scoring rules changed since the standings were built with `previous`:
+    move every player's total by the difference the new rules make to each
+    of their results (so points not backed by history, e.g. CSV imports, stay)
+    """
+    current = _standings_signature()
+    changed = False
+    for player in _store.sync_index(_player_view).values():
+        delta = sum(
+            _race_points(r.position, r.fastest_lap, r.dnf, current)
+            - _race_points(r.position, r.fastest_lap, r.dnf, previous)
+            for r in _all_seasons("championship", player.user_id)
+        )
+        if delta:
+            tx.put("players", player.user_id, "total_points", player.total_points + delta)
+            changed = True
+    if changed:
+        print("🔧 Championship points re-scored for the new points system")
+
+
+def _standings_entry(player: Player) -> dict:
+    return {
+        "username": player.username,
+        "total_points": player.total_points,
+        "races_completed": player.races_completed,
+        "wins": player.wins,
+        "team": player.team
+    }
+
+
+def _standings_key(user_id_str: str, entry: dict) -> tuple:
+    # Points first, then wins, then a stable order by user ID
+    return (-entry["total_points"], -entry["wins"], user_id_str)
+
+
+# Sorted standings keys, kept in memory and valid for one standings token
+_standings_order = {"token": None, "keys": []}
+
+
+def _sort_standings(standings: dict) -> list:
+    return sorted(_standings_key(uid, entry) for uid, entry in standings["drivers"].items())
+
+
+def _standings_keys(standings: dict) -> list:
+    """Sorted order for the stored standings (rebuilt only if it went stale)"""
+    if _store.reading_snapshot is not None:
+        # The writer re-ranks its order in place; readers get one of their own
+        return _memo("standings", standings["token"], lambda: _sort_standings(standings))
+    if _standings_order["token"] != standings["token"]:
+        _standings_order["keys"] = _sort_standings(standings)
+        _standings_order["token"] = standings["token"]
+    return _standings_order["keys"]
+
+
+def _ensure_standings(tx) -> dict:
+    """Stored standings, rebuilt from player data if missing or the scoring changed (results are re-scored first)"""
+    standings = tx.data.get("standings")
+    if not standings or standings.get("signature") != _standings_signature():
+        previous = (standings or {}).get("signature") or {}
+        if all(field in previous for field in _SCORING_FIELDS) and \
+                any(previous[field] != _standings_signature()[field] for field in _SCORING_FIELDS):
+            _rescore_players(tx, previous)
+        drivers = {
+            player.user_id: _standings_entry(player)
+            for player in _store.sync_index(_player_view).values()
+            if player.is_driver
+        }
+        tx.put("standings", {"signature": _standings_signature(), "token": uuid.uuid4().hex, "drivers": drivers})
+        standings = tx.data["standings"]
+    return standings
+
+
+def _update_standings(tx, user_id_str: str) -> None:
+    """Re-rank one player in the stored standings after their record changed"""
+    standings = _ensure_standings(tx)
+    keys = _standings_keys(standings)
+    
+    old = standings["drivers"].get(user_id_str)
+    if old is not None:
+        index = bisect.bisect_left(keys, _standings_key(user_id_str, old))
+        del keys[index]
+        tx.delete("standings", "drivers", user_id_str)
+    
+    record = tx.data["players"].get(user_id_str)
+    if record and record.get("role") == "driver":
+        entry = _standings_entry(Player.from_dict(user_id_str, record))
+        tx.put("standings", "drivers", user_id_str, entry)
+        bisect.insort(keys, _standings_key(user_id_str, entry))
     
-    # Sort by points (descending)
-    standings.sort(key=lambda x: x["total_points"], reverse=True)
+    # A rolled-back transaction restores the old token, which invalidates the in-memory order
+    token = uuid.uuid4().hex
+    tx.put("standings", "token", token)
+    _standings_order["token"] = token
+
+
+def _current_standings() -> dict:
+    """
+    Stored standings, rebuilt first if needed (call with the store lock held;
+    in snapshot_call() the rebuild is handed to the writer)
+    """
+    standings = load_database().get("standings")
+    if not standings or standings.get("signature") != _standings_signature():
+        with _store.transaction("rebuild_standings") as tx:
+            standings = _ensure_standings(tx)
     return standings
 
 
+def _sync_standings(tx) -> None:
+    """
+    Re-rank the drivers whose stored standings entry no longer matches their
+    player record, e.g. after processes that don't keep the standings
+    (registration bot, web) registered or removed drivers
+    """
+    standings = _ensure_standings(tx)
+    players = _store.sync_index(_player_view)
+    drivers = standings["drivers"]
+    
+    def expected(user_id_str: str) -> Optional[dict]:
+        player = players.get(user_id_str)
+        return _standings_entry(player) if player and player.is_driver else None
+    
+    candidates = list(drivers) + [p.user_id for p in players.values() if p.is_driver and p.user_id not in drivers]
+    for user_id_str in [uid for uid in candidates if expected(uid) != drivers.get(uid)]:
+        _update_standings(tx, user_id_str)
+
+
+def get_championship_standings(limit: int = None) -> list:
+    """Get championship standings sorted by total points (top `limit` only if given)"""
+    with _store.lock:
+        standings = _current_standings()
+        keys = _standings_keys(standings)
+        if limit is not None:
+            keys = keys[:limit]
+        
+        drivers = standings["drivers"]
+        return [
+            {
+                "user_id": uid,
+                "username": drivers[uid]["username"],
+                "total_points": drivers[uid]["total_points"],
+                "races_completed": drivers[uid]["races_completed"]
+            }
+            for _, _, uid in keys
+        ]
+
+
 def get_user_race_history(user_id: int) -> list:
-    """Get race history for a specific user"""
-    player = get_player(user_id)
-    if not player:
+    """Get race history for a specific user (all seasons)"""
+    if not get_player(user_id):
         return []
-    return player.get("championship_history", [])
+    return [entry.to_dict() for entry in _all_seasons("championship", str(user_id))]
+
+
+# user_id -> (history version, stats derived from the history); see get_driver_stats()
+_driver_stats_cache = {}
+
+
+def _compute_driver_stats(seasons: list) -> dict:
+    """Everything get_driver_stats() derives from a driver's history, given as [(races, qualifying)] per season"""
+    races = [r for season_races, _ in seasons for r in season_races]
+    finished = [r for r in races if not r.dnf]
+    deltas = []
+    for season_races, qualifying in seasons:
+        # Race names repeat every season, so the grid is matched within one
+        grid = {q.race_name: q.position for q in qualifying}
+        deltas += [grid[r.race_name] - r.position for r in season_races if not r.dnf and r.race_name in grid]
+    recent = races[-config.STATS_FORM_RACES:]
+    
+    return {
+        "total_races": len(races),
+        "wins": sum(1 for r in finished if r.position == 1),
+        "podiums": sum(1 for r in finished if r.position <= 3),
+        "fastest_laps": sum(1 for r in races if r.fastest_lap),
+        "average_position": sum(r.position for r in finished) / len(finished) if finished else 0,
+        "best_finish": min((r.position for r in finished), default=99),
+        "dnf_rate": (len(races) - len(finished)) / len(races) if races else 0,
+        "points_per_race": sum(r.points for r in races) / len(races) if races else 0,
+        # Positive = places gained from the grid
+        "average_grid_delta": sum(deltas) / len(deltas) if deltas else None,
+        "form": ["DNF" if r.dnf else r.position for r in recent],
+        "form_points_per_race": sum(r.points for r in recent) / len(recent) if recent else 0
+    }
+
+
+def get_driver_stats(user_id: int) -> dict:
+    """Get comprehensive statistics for a driver (cached until their results or qualifying change)"""
+    with _store.lock:
+        player = _store.sync_index(_player_view).get(str(user_id))
+    if not player or not player.is_driver:
+        return {}
+    
+    seasons = _history.seasons()
+    version = tuple(_history.version(player.user_id, ("championship", "qualifying"), season) for season in seasons)
+    cached = _driver_stats_cache.get(player.user_id)
+    if cached is None or cached[0] != version:
+        stats = _compute_driver_stats([(_history.records("championship", player.user_id, season),
+                                        _history.records("qualifying", player.user_id, season))
+                                       for season in seasons])
+        cached = (version, stats)
+        _driver_stats_cache[player.user_id] = cached
+    
+    return {**cached[1], "total_points": player.total_points}
+
+
+def get_board_message(name: str) -> Optional[dict]:
+    """Saved Discord message of a live board ("standings", "constructors", "records")"""
+    db = load_database()
+    board = db.get("boards", {}).get(name)
+    return dict(board) if board else None
+
+
+def save_board_message(name: str, channel_id: int, message_id: int, digest: str) -> None:
+    """Remember which message shows a board and a hash of what it shows"""
+    with _store.transaction("save_board_message") as tx:
+        if "boards" not in tx.data:
+            tx.put("boards", {})
+        tx.put("boards", name, {
+            "channel_id": str(channel_id),
+            "message_id": str(message_id),
+            "digest": digest,
+            "updated_at": datetime.now().isoformat()
+        })
+
+
+def forget_board_message(message_id: int) -> Optional[str]:
+    """Drop the board shown by a deleted message so the next update re-posts it; returns the board name"""
+    with _store.transaction("forget_board_message") as tx:
+        for name, board in tx.data.get("boards", {}).items():
+            if board.get("message_id") == str(message_id):
+                tx.delete("boards", name)
+                return name
+    return None
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -321,39 +818,34 @@ def get_user_race_history(user_id: int) -> list:
 
 def update_last_activity(user_id: int) -> None:
     """Update last activity timestamp for a user"""
-    db = load_database()
     user_id_str = str(user_id)
     
-    if user_id_str in db["players"]:
-        db["players"][user_id_str]["last_activity"] = datetime.now().isoformat()
-        save_database(db)
+    with _store.transaction("update_last_activity") as tx:
+        if user_id_str in tx.data["players"]:
+            tx.put("players", user_id_str, "last_activity", datetime.now().isoformat())
 
 
 def track_race_attendance(race_name: str, participant_ids: list) -> None:
     """Track which users participated in a race"""
-    db = load_database()
-    
-    # Add race to history
-    race_entry = {
-        "race_name": race_name,
-        "date": datetime.now().isoformat(),
-        "participants": participant_ids
-    }
-    db["races_history"].append(race_entry)
-    
-    # Update missed races counter
-    for user_id_str, player in db["players"].items():
-        if player.get("role") == "driver":
-            user_id = int(user_id_str)
-            if user_id in participant_ids:
-                # Reset missed races
-                db["players"][user_id_str]["missed_races"] = 0
-            else:
-                # Increment missed races
-                current = db["players"][user_id_str].get("missed_races", 0)
-                db["players"][user_id_str]["missed_races"] = current + 1
-    
-    save_database(db)
+    with _store.transaction("track_race_attendance") as tx:
+        # Add race to history
+        race_entry = {
+            "race_name": race_name,
+            "date": datetime.now().isoformat(),
+            "participants": participant_ids
+        }
+        tx.append("races_history", race_entry)
+        
+        # Update missed races counter
+        participants = {str(uid) for uid in participant_ids}
+        for player in _store.sync_index(_player_view).values():
+            if player.is_driver:
+                if player.user_id in participants:
+                    # Reset missed races
+                    tx.put("players", player.user_id, "missed_races", 0)
+                else:
+                    # Increment missed races
+                    tx.put("players", player.user_id, "missed_races", player.missed_races + 1)
 
 
 def get_inactive_users(threshold: int = None) -> list:
@@ -361,18 +853,23 @@ def get_inactive_users(threshold: int = None) -> list:
     if threshold is None:
         threshold = config.INACTIVITY_THRESHOLD
     
-    db = load_database()
     inactive = []
     
-    for user_id, player in db["players"].items():
-        if player.get("role") == "driver":
-            missed = player.get("missed_races", 0)
-            if missed >= threshold:
+    with _store.lock:
+        index = _store.sync_index(_players_index)
+        players = _store.sync_index(_player_view)
+        
+        # Only drivers are indexed by missed races; walk the buckets at or over the threshold
+        for missed in sorted(index.keys("missed_races"), reverse=True):
+            if missed < threshold:
+                break
+            for user_id in index.get("missed_races", missed):
+                player = players.get(user_id)
                 inactive.append({
                     "user_id": user_id,
-                    "username": player.get("username", "Unknown"),
+                    "username": player.username,
                     "missed_races": missed,
-                    "last_activity": player.get("last_activity", "N/A")
+                    "last_activity": player.last_activity or "N/A"
                 })
     
     return inactive
@@ -380,20 +877,47 @@ def get_inactive_users(threshold: int = None) -> list:
 
 def reset_missed_races(user_id: int) -> bool:
     """Reset missed races counter for a user"""
-    db = load_database()
     user_id_str = str(user_id)
     
-    if user_id_str in db["players"]:
-        db["players"][user_id_str]["missed_races"] = 0
-        save_database(db)
-        return True
+    with _store.transaction("reset_missed_races") as tx:
+        if user_id_str in tx.data["players"]:
+            tx.put("players", user_id_str, "missed_races", 0)
+            return True
     return False
 
 
+# ═══════════════════════════════════════════════════════════════
+# MODULE 10: NOTIFICATION HUB
+# ═══════════════════════════════════════════════════════════════
+
+def get_notification_outcomes(key: str) -> dict:
+    """Delivery outcome per user id of one notification (e.g. "race_reminder:<timestamp>")"""
+    db = load_database()
+    return dict(db.get("notifications", {}).get(key, {}).get("outcomes", {}))
+
+
+def record_notification_outcomes(key: str, outcomes: dict) -> None:
+    """Merge delivery outcomes ("sent", "forbidden", "not_found", "failed") into a notification's log"""
+    with _store.transaction("record_notification_outcomes") as tx:
+        if "notifications" not in tx.data:
+            tx.put("notifications", {})
+        if key not in tx.data["notifications"]:
+            tx.put("notifications", key, {"outcomes": {}})
+        for user_id, outcome in outcomes.items():
+            tx.put("notifications", key, "outcomes", str(user_id), outcome)
+        tx.put("notifications", key, "updated_at", datetime.now().isoformat())
+
+
 # ═══════════════════════════════════════════════════════════════
 # MODULE 4: DATA EXPORT
 # ═══════════════════════════════════════════════════════════════
 
+def export_to_json_string() -> str:
+    """Export the whole database as indented, human-readable JSON"""
+    with _store.lock:
+        return codec.dumps(_store.data, pretty=True)
+
+
 def export_to_csv_string() -> str:
     """Export all player data to CSV string"""
     import csv
@@ -451,49 +975,50 @@ def import_from_csv(csv_content: str) -> dict:
     import csv
     import io
     
-    db = load_database()
     imported = 0
     errors = []
     
     try:
-        reader = csv.DictReader(io.StringIO(csv_content))
-        base_keys = {"User ID", "Username", "Role", "Total Points", "Penalty Points", "Missed Races", "Last Activity"}
+        with _store.transaction("import_from_csv") as tx:
+            reader = csv.DictReader(io.StringIO(csv_content))
+            base_keys = {"User ID", "Username", "Role", "Total Points", "Penalty Points", "Missed Races", "Last Activity"}
         
-        for row in reader:
-            try:
-                user_id = row.get("User ID")
-                username = row.get("Username", "Unknown")
-                role = row.get("Role", "driver")
+            for row in reader:
+                try:
+                    user_id = row.get("User ID")
+                    username = row.get("Username", "Unknown")
+                    role = row.get("Role", "driver")
                 
-                if not user_id:
-                    errors.append(f"Missing User ID in row: {row}")
-                    continue
+                    if not user_id:
+                        errors.append(f"Missing User ID in row: {row}")
+                        continue
                 
-                # Reconstruct answers from remaining columns
-                answers = {}
-                for key, value in row.items():
-                    if key not in base_keys and value:
-                        answers[key.lower().replace(" ", "_")] = value
+                    # Reconstruct answers from remaining columns
+                    answers = {}
+                    for key, value in row.items():
+                        if key not in base_keys and value:
+                            answers[key.lower().replace(" ", "_")] = value
                 
-                player_data = {
-                    "username": username,
-                    "role": role,
-                    "answers": answers,
-                    "total_points": int(row.get("Total Points", 0)),
-                    "penalties": {"total_points": int(row.get("Penalty Points", 0)), "history": []},
-                    "missed_races": int(row.get("Missed Races", 0)),
-                    "last_activity": row.get("Last Activity", datetime.now().isoformat()),
-                    "registered_at": datetime.now().isoformat(),
-                    "updated_at": None
-                }
+                    player_data = {
+                        "username": username,
+                        "role": role,
+                        "answers": answers,
+                        "total_points": int(row.get("Total Points", 0)),
+                        "penalties": {"total_points": int(row.get("Penalty Points", 0))},
+                        "missed_races": int(row.get("Missed Races", 0)),
+                        "last_activity": row.get("Last Activity", datetime.now().isoformat()),
+                        "registered_at": datetime.now().isoformat(),
+                        "updated_at": None
+                    }
                 
-                db["players"][str(user_id)] = initialize_player_structure(player_data)
-                imported += 1
+                    tx.put("players", str(user_id), initialize_player_structure(player_data))
+                    imported += 1
                 
-            except Exception as e:
-                errors.append(f"Error processing row: {e}")
-        
-        save_database(db)
+                except Exception as e:
+                    errors.append(f"Error processing row: {e}")
+            
+            # Rebuilt from the imported players on next read
+            tx.delete("standings")
         
         return {
             "success": True,
@@ -507,3 +1032,86 @@ def import_from_csv(csv_content: str) -> dict:
             "imported_count": 0,
             "errors": [str(e)]
         }
+
+
+# ═══════════════════════════════════════════════════════════════
+# SCHEMA VERSIONING
+# ═══════════════════════════════════════════════════════════════
+
+# Bump this and add a step to _MIGRATIONS whenever the stored layout changes
+SCHEMA_VERSION = 2
+
+
+def _upgrade_players(tx) -> int:
+    """Schema 1: give every player the MODULE 1/5/6 fields. Returns how many records changed."""
+    changed = 0
+    for user_id_str, player in tx.data["players"].items():
+        if any(key not in player for key in _player_defaults(player)):
+            initialize_player_structure(tx.touch("players", user_id_str))
+            changed += 1
+    return changed
+
+
+def _race_aggregates(history: list) -> dict:
+    return {
+        "races_completed": len(history),
+        "wins": sum(1 for r in history if r.get("position") == 1),
+        "podiums": sum(1 for r in history if r.get("position", 99) <= 3),
+        "fastest_laps": sum(1 for r in history if r.get("fastest_lap"))
+    }
+
+
+def _split_history(tx) -> int:
+    """Schema 2: move inline histories into the current season's segments, keep aggregates on the player"""
+    moved = {"championship": [], "qualifying": [], "penalties": []}
+    for user_id_str in list(tx.data["players"]):
+        player = tx.touch("players", user_id_str)
+        races = player.pop("championship_history", None) or []
+        moved["championship"] += [(user_id_str, entry) for entry in races]
+        moved["qualifying"] += [(user_id_str, entry) for entry in player.pop("qualifying_history", None) or []]
+        if isinstance(player.get("penalties"), dict):
+            moved["penalties"] += [(user_id_str, entry) for entry in player["penalties"].pop("history", None) or []]
+        player.update(_race_aggregates(races))
+    
+    # Written before the players are committed; a re-run replaces these entries
+    for kind, rows in moved.items():
+        _history.import_entries(kind, rows)
+    return sum(len(rows) for rows in moved.values())
+
+
+# schema version -> step that upgrades the previous version to it
+_MIGRATIONS = {
+    1: _upgrade_players,
+    2: _split_history,
+}
+
+
+def migrate_database() -> int:
+    """
+    Upgrade the stored database to SCHEMA_VERSION (run once at startup).
+    Returns the version the data was at before.
+    """
+    with _store.transaction("migrate_database") as tx:
+        version = tx.data.get("schema_version", 0)
+        if version >= SCHEMA_VERSION:
+            return version
+        
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            _MIGRATIONS[target](tx)
+        tx.put("schema_version", SCHEMA_VERSION)
+    
+    print(f"🔧 Database schema upgraded: v{version} → v{SCHEMA_VERSION}")
+    return version
+
+
+def _repair_players(data: dict) -> None:
+    # Processes that don't know the schema (registration bot, web) may have
+    # added bare records; a reload already costs a full parse, so check them all.
+    # They don't keep the standings either, so those are brought in line too.
+    _standings_order["token"] = None
+    with _store.transaction("repair_players") as tx:
+        _upgrade_players(tx)
+        _sync_standings(tx)
+
+
+_store.add_reload_listener(_repair_players)
@@ -0,0 +1,124 @@
+"""
+Typed records for players, history entries and the race calendar
+
+Slotted dataclasses: no per-instance __dict__, so each record takes a
+fraction of the memory of the equivalent dict, and readers use attribute
+access instead of .get(..., default) chains. The JSON layout on disk does
+not change - from_dict() fills in defaults for missing fields and
+to_dict() gives back the stored form.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class PenaltyEntry:
+    points: int = 0
+    reason: str = ""
+    date: str = ""
+    incident_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PenaltyEntry":
+        return cls(data.get("points", 0), data.get("reason", ""), data.get("date", ""), data.get("incident_id"))
+
+    def to_dict(self) -> dict:
+        return {"date": self.date, "points": self.points, "reason": self.reason, "incident_id": self.incident_id}
+
+
+@dataclass(slots=True)
+class RaceEntry:
+    race_name: str = ""
+    position: int = 99
+    points: int = 0
+    fastest_lap: bool = False
+    date: str = ""
+    dnf: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RaceEntry":
+        return cls(data.get("race_name", ""), data.get("position", 99), data.get("points", 0),
+                   bool(data.get("fastest_lap")), data.get("date", ""), bool(data.get("dnf")))
+
+    def to_dict(self) -> dict:
+        return {"race_name": self.race_name, "position": self.position, "points": self.points,
+                "fastest_lap": self.fastest_lap, "date": self.date, "dnf": self.dnf}
+
+
+@dataclass(slots=True)
+class QualiEntry:
+    race_name: str = ""
+    position: int = 99
+    date: str = ""
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QualiEntry":
+        return cls(data.get("race_name", ""), data.get("position", 99), data.get("date", ""))
+
+    def to_dict(self) -> dict:
+        return {"race_name": self.race_name, "position": self.position, "date": self.date}
+
+
+@dataclass(slots=True)
+class CalendarRace:
+    round: int = 0
+    race_name: str = ""
+    track: str = ""
+    date_timestamp: int = 0
+    status: str = "upcoming"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CalendarRace":
+        return cls(data.get("round", 0), data.get("race_name", ""), data.get("track", ""),
+                   data.get("date_timestamp", 0), data.get("status", "upcoming"))
+
+    def to_dict(self) -> dict:
+        return {"round": self.round, "race_name": self.race_name, "track": self.track,
+                "date_timestamp": self.date_timestamp, "status": self.status}
+
+
+@dataclass(slots=True)
+class Player:
+    """Read-only typed view of a stored player record"""
+    user_id: str
+    username: str = "Unknown"
+    role: Optional[str] = None
+    team: Optional[str] = None
+    ea_id: Optional[str] = None
+    registered_at: Optional[str] = None
+    last_activity: Optional[str] = None
+    total_points: int = 0
+    races_completed: int = 0
+    wins: int = 0
+    podiums: int = 0
+    fastest_laps: int = 0
+    pole_positions: int = 0
+    missed_races: int = 0
+    penalty_points: int = 0
+    penalties_reset_at: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, user_id: str, data: dict) -> "Player":
+        penalties = data.get("penalties") or {}
+        return cls(
+            user_id,
+            data.get("username", "Unknown"),
+            data.get("role"),
+            data.get("team"),
+            (data.get("answers") or {}).get("ea_id"),
+            data.get("registered_at"),
+            data.get("last_activity"),
+            data.get("total_points", 0),
+            data.get("races_completed", 0),
+            data.get("wins", 0),
+            data.get("podiums", 0),
+            data.get("fastest_laps", 0),
+            data.get("pole_positions", 0),
+            data.get("missed_races", 0),
+            penalties.get("total_points", 0),
+            penalties.get("reset_at"),
+        )
+
+    @property
+    def is_driver(self) -> bool:
+        return self.role == "driver"
@@ -0,0 +1,238 @@
+"""
+Race archive: one immutable JSON file per race plus a compact season index
+
+Every race is written once to data/races/ as YYYY-MM-DD_okruh.json (a
+further race at the same circuit on the same day gets YYYY-MM-DD_okruh_2.json,
+_3, ...):
+
+    {"metadata": {"date", "time", "circuit", "type", "season", "race_name", "race_id"},
+     "results": [{"position", "name", "team", "time", "fastest_lap", "points", "user_id"}]}
+
+Next to the race files each season has an index (index_2026.json) with the
+race list, a SHA-256 checksum of every race file and per-driver aggregates.
+Readers load the index and only the race files they actually show.
+
+Rebuild a damaged or missing index from the race files:
+    python race_archive.py [races_dir] [season]
+"""
+import copy
+import hashlib
+import os
+import re
+import sys
+import threading
+import unicodedata
+from datetime import datetime
+
+import codec
+from storage import FileLock, atomic_write_text
+
+INDEX_PREFIX = "index_"
+_RACE_FILE = re.compile(r"^\d{4}-\d{2}-\d{2}_[a-z0-9-]+(_\d+)?\.json$")
+
+
+def circuit_slug(circuit: str) -> str:
+    """'Autódromo José Carlos Pace' -> 'autodromo-jose-carlos-pace'"""
+    ascii_name = unicodedata.normalize("NFKD", str(circuit)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-")
+
+
+def race_filename(date: str, circuit: str, number: int = 1) -> str:
+    """File name for a race: YYYY-MM-DD_okruh.json, YYYY-MM-DD_okruh_2.json for the second one that day"""
+    datetime.strptime(date, "%Y-%m-%d")  # ValueError on anything else
+    slug = circuit_slug(circuit)
+    if not slug:
+        raise ValueError(f"Circuit name gives an empty file name: {circuit!r}")
+    return f"{date}_{slug}.json" if number == 1 else f"{date}_{slug}_{number}.json"
+
+
+def _driver_key(row: dict) -> str:
+    return str(row["user_id"]) if row.get("user_id") is not None else row.get("name") or "?"
+
+
+def _index_entry(filename: str, race: dict, text: str) -> dict:
+    metadata = race["metadata"]
+    results = race["results"]
+    winner = next((r for r in results if r.get("position") == 1), None)
+    return {
+        "file": filename,
+        "date": metadata["date"],
+        "time": metadata.get("time"),
+        "circuit": metadata["circuit"],
+        "type": metadata.get("type", "race"),
+        "race_name": metadata.get("race_name"),
+        "entries": len(results),
+        "winner": winner.get("name") if winner else None,
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    }
+
+
+def _add_to_drivers(drivers: dict, results: list) -> None:
+    """Fold one race's results into the per-driver aggregates"""
+    for row in results:
+        stats = drivers.setdefault(_driver_key(row), {
+            "name": row.get("name"), "team": row.get("team"), "races": 0, "points": 0,
+            "wins": 0, "podiums": 0, "fastest_laps": 0, "best_finish": None,
+        })
+        # Latest race wins for display fields
+        stats["name"] = row.get("name") or stats["name"]
+        stats["team"] = row.get("team") or stats["team"]
+        position = row.get("position")
+        stats["races"] += 1
+        stats["points"] += row.get("points") or 0
+        stats["fastest_laps"] += int(bool(row.get("fastest_lap")))
+        if isinstance(position, int):
+            stats["wins"] += int(position == 1)
+            stats["podiums"] += int(position <= 3)
+            if stats["best_finish"] is None or position < stats["best_finish"]:
+                stats["best_finish"] = position
+
+
+class RaceArchive:
+    """Immutable per-race files with a per-season index"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(directory, ".index.lock"))
+        self._indexes = {}  # season -> (stat signature, index)
+        self._races = {}    # file name -> race (files never change once written)
+
+    def index_path(self, season: str) -> str:
+        return os.path.join(self.directory, f"{INDEX_PREFIX}{season}.json")
+
+    def write_race(self, metadata: dict, results: list) -> str:
+        """
+        Archive a race and add it to its season index. metadata needs "date"
+        (YYYY-MM-DD) and "circuit"; the season defaults to the date's year.
+        Returns the file name. Archived races are never overwritten; writing
+        a race whose "race_id" is already archived (a journal replay) returns
+        its existing file.
+        """
+        metadata = dict(metadata)
+        metadata.setdefault("type", "race")
+        metadata["season"] = str(metadata.get("season") or metadata["date"][:4])
+        race = {"metadata": metadata, "results": sorted(results, key=lambda r: r.get("position") or 0)}
+        text = codec.dumps(race, pretty=True)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, self._file_lock:
+            filename, archived = self._place(metadata)
+            if archived is None:
+                atomic_write_text(os.path.join(self.directory, filename), text)
+            else:
+                text, race = archived, codec.loads(archived)
+
+            season = race["metadata"]["season"]
+            index = self._read_index(season) or {"season": season, "races": [], "drivers": {}}
+            if any(r["file"] == filename for r in index["races"]):
+                return filename
+            index["races"].append(_index_entry(filename, race, text))
+            index["races"].sort(key=lambda r: (r["date"], r.get("time") or "", r["file"]))
+            _add_to_drivers(index["drivers"], race["results"])
+            self._write_index(season, index)
+            self._races[filename] = race
+        return filename
+
+    def index(self, season: str) -> dict:
+        """Season index (race list, checksums, driver aggregates); empty if nothing is archived"""
+        season = str(season)
+        path = self.index_path(season)
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return {"season": season, "races": [], "drivers": {}}
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+            cached = self._indexes.get(season)
+            if not cached or cached[0] != signature:
+                cached = (signature, self._read_index(season) or {"season": season, "races": [], "drivers": {}})
+                self._indexes[season] = cached
+            return copy.deepcopy(cached[1])
+
+    def race(self, filename: str, verify: bool = True) -> dict:
+        """One archived race; with verify, its checksum must match the season index"""
+        if not _RACE_FILE.match(filename):
+            raise ValueError(f"Not a race file name: {filename!r}")
+        with self._lock:
+            race = self._races.get(filename)
+            if race is None:
+                with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                    text = f.read()
+                race = codec.loads(text)
+                if verify:
+                    listed = next((r for r in self.index(race["metadata"]["season"])["races"]
+                                   if r["file"] == filename), None)
+                    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                    if listed is None or listed["sha256"] != digest:
+                        raise ValueError(f"Race file does not match the season index: {filename}")
+                self._races[filename] = race
+            return copy.deepcopy(race)
+
+    def seasons(self) -> list:
+        """Seasons that have an index, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[len(INDEX_PREFIX):-len(".json")] for name in os.listdir(self.directory)
+                      if name.startswith(INDEX_PREFIX) and name.endswith(".json"))
+
+    def rebuild_index(self, season: str) -> dict:
+        """Regenerate a season index from the race files on disk"""
+        season = str(season)
+        index = {"season": season, "races": [], "drivers": {}}
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, self._file_lock:
+            for filename in sorted(os.listdir(self.directory)):
+                if not _RACE_FILE.match(filename):
+                    continue
+                with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                    text = f.read()
+                try:
+                    race = codec.loads(text)
+                    if str(race["metadata"].get("season") or race["metadata"]["date"][:4]) != season:
+                        continue
+                    index["races"].append(_index_entry(filename, race, text))
+                except (ValueError, KeyError, TypeError):
+                    print(f"⚠️ Skipping unreadable race file {filename}")
+                    continue
+                _add_to_drivers(index["drivers"], race["results"])
+            index["races"].sort(key=lambda r: (r["date"], r.get("time") or "", r["file"]))
+            self._write_index(season, index)
+        return index
+
+    def _place(self, metadata: dict) -> tuple:
+        """
+        (file name, None) for a new race: the first free numbered name for its
+        date and circuit. (file name, file text) when the race is already there.
+        """
+        race_id = metadata.get("race_id")
+        number = 1
+        while True:
+            filename = race_filename(metadata["date"], metadata["circuit"], number)
+            path = os.path.join(self.directory, filename)
+            if not os.path.exists(path):
+                return filename, None
+            if race_id is not None:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                if codec.loads(text)["metadata"].get("race_id") == race_id:
+                    return filename, text
+            number += 1
+
+    def _read_index(self, season: str):
+        try:
+            return codec.load_file(self.index_path(season))
+        except FileNotFoundError:
+            return None
+
+    def _write_index(self, season: str, index: dict) -> None:
+        # Compact: the index is read on every dashboard load
+        atomic_write_text(self.index_path(season), codec.dumps(index))
+        self._indexes.pop(season, None)
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "races")
+    season = sys.argv[2] if len(sys.argv) > 2 else str(datetime.now().year)
+    rebuilt = RaceArchive(directory).rebuild_index(season)
+    print(f"✅ Indexed {len(rebuilt['races'])} race(s), {len(rebuilt['drivers'])} driver(s) for season {season}")
@@ -0,0 +1,995 @@
+"""
+Resident in-memory store for the player database with write-behind persistence
+
+Every change is made inside a transaction. On commit the changed paths are
+appended to a write-ahead journal (one small, fsynced line per operation);
+the full database is only rewritten at checkpoints, using temp file + fsync
++ rename so a crash can never leave a truncated file behind. On startup the
+journal is replayed on top of the last checkpoint. Journal records carry a
+sequence number and each checkpoint stores the last one it contains, so a
+crash between a checkpoint and the journal truncation replays nothing twice.
+
+Items for append-only side logs kept outside the database (see
+Transaction.write_log) are journaled with the change and written after it,
+so a crash in between cannot lose them: they are written again on replay.
+
+Several processes may share the same files. Writers take an advisory lock
+(`<file>.lock`) and bump a generation counter (`<file>.version`); readers
+notice changes made by others with a cheap stat/generation poll and reload.
+
+Queries that should not wait for writers can run on a Snapshot (see
+DatabaseStore.reading): a frozen copy of the committed data and indexes,
+republished after every commit by copying only the paths it changed.
+"""
+import atexit
+import copy
+import os
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import codec
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_MISSING = object()
+
+# Read once at import (os.umask can only be read by setting it, which races with other threads)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Top-level key of a checkpoint: sequence number of the last journal record it includes
+JOURNAL_SEQ_KEY = "journal_seq"
+
+
+class SnapshotUnavailable(Exception):
+    """A query cannot be served from the snapshot; run it under the store lock instead"""
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Replace `path` with `text` atomically (temp file + fsync + rename)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if os.name == "posix":
+                # mkstemp creates 0600; keep the file readable by whoever could read it before
+                try:
+                    mode = stat.S_IMODE(os.stat(path).st_mode)
+                except FileNotFoundError:
+                    mode = 0o666 & ~_UMASK
+                os.fchmod(f.fileno(), mode)
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory: str) -> None:
+    # Make the rename itself durable (not supported on Windows)
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """Advisory inter-process lock held on a separate lock file (reentrant within a process)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self) -> None:
+        self._mutex.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a+")
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue  # LK_LOCK gives up after ~10 s, keep waiting
+            except BaseException:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                self._mutex.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._file.close()
+                self._file = None
+        self._mutex.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def read_generation(data_path: str) -> int:
+    """Current generation stamp of a data file (bumped by every writer)"""
+    try:
+        with open(data_path + ".version", "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation(data_path: str) -> int:
+    """Increase the generation stamp of a data file; call while holding its FileLock"""
+    generation = read_generation(data_path) + 1
+    with open(data_path + ".version", "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    return generation
+
+
+def _resolve(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+
+def _get_path(data, path):
+    try:
+        return _resolve(data, path)
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+
+
+def apply_changes(data: dict, changes: list) -> None:
+    """Apply journaled changes (["set", path, value], ["del", path], ["append", path, value])"""
+    for change in changes:
+        action, path = change[0], change[1]
+        if not path:
+            if action == "set":
+                data.clear()
+                data.update(change[2])
+            continue
+
+        parent = data
+        for key in path[:-1]:
+            if isinstance(parent, dict):
+                parent = parent.setdefault(key, {})
+            else:
+                parent = parent[key]
+        key = path[-1]
+
+        if action == "set":
+            if isinstance(parent, list) and key == len(parent):
+                parent.append(change[2])
+            else:
+                parent[key] = change[2]
+        elif action == "del":
+            if isinstance(parent, dict):
+                parent.pop(key, None)
+            elif 0 <= key < len(parent):
+                del parent[key]
+        elif action == "append":
+            if isinstance(parent, dict):
+                parent.setdefault(key, []).append(change[2])
+            else:
+                parent[key].append(change[2])
+
+
+class Journal:
+    """Append-only log of committed changes, one JSON record per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, record: dict) -> None:
+        line = codec.dumps(record)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self) -> list:
+        """All complete records; a torn last line (crash mid-append) is ignored"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(codec.loads(line))
+                except ValueError:
+                    print(f"⚠️ Warning: Ignoring damaged journal record at {self.path}:{line_no}")
+                    break
+        return records
+
+    def truncate(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class Transaction:
+    """
+    Records which paths of the database a mutation touched.
+
+    Call `touch()` before mutating an object in place, or use `put()`,
+    `delete()` and `append()`. Everything done through a transaction is
+    journaled on commit and rolled back if the block raises.
+    """
+
+    def __init__(self, data: dict, op: str):
+        self.data = data
+        self.op = op
+        self._undo = []
+        self._changed = {}  # path -> "set" (value is read at commit time)
+        self._order = []    # ("path", path) or ("append", path, item), in call order
+        self._logs = {}     # side log name -> items, see write_log()
+        self._after_commit = []
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._order or self._logs)
+
+    def touch(self, *path):
+        """Return the live object at `path`, to be modified in place"""
+        value = _resolve(self.data, path)
+        self._undo.append(("set", path, copy.deepcopy(value)))
+        self._mark(path)
+        return value
+
+    def put(self, *path_and_value) -> None:
+        """Set the value at a path (the last argument is the value)"""
+        *path, value = path_and_value
+        path = tuple(path)
+        parent = _resolve(self.data, path[:-1])
+        old = _get_path(self.data, path)
+        self._undo.append(("set", path, old))
+        if isinstance(parent, list) and path[-1] == len(parent):
+            parent.append(value)
+        else:
+            parent[path[-1]] = value
+        self._mark(path)
+
+    def put_document(self, document: dict) -> None:
+        """Make the whole database equal to `document`, top-level key by key"""
+        for key in [k for k in self.data if k not in document and k != JOURNAL_SEQ_KEY]:
+            self.delete(key)
+        for key, value in document.items():
+            if key != JOURNAL_SEQ_KEY:
+                self.put(key, value)
+
+    def delete(self, *path) -> None:
+        old = _get_path(self.data, path)
+        if old is _MISSING:
+            return
+        del _resolve(self.data, path[:-1])[path[-1]]
+        self._undo.append(("set", path, old))
+        self._mark(path)
+
+    def append(self, *path_and_item) -> None:
+        """Append an item to the list at a path"""
+        *path, item = path_and_item
+        path = tuple(path)
+        _resolve(self.data, path).append(item)
+        self._undo.append(("pop", path, None))
+        self._order.append(("append", path, item))
+
+    def write_log(self, name: str, item) -> None:
+        """
+        Queue an item for the side log `name` (registered with
+        DatabaseStore.add_log). It is journaled together with this
+        transaction and written to the log once the transaction commits.
+        """
+        self._logs.setdefault(name, []).append(item)
+
+    def after_commit(self, callback) -> None:
+        """Run `callback()` once the transaction has committed (skipped on rollback)"""
+        self._after_commit.append(callback)
+
+    def touched(self, collection: str):
+        """Keys of `collection` this transaction changed, or None if the whole collection was replaced"""
+        keys = set()
+        for entry in self._order:
+            path = entry[1]
+            if len(path) < 2:
+                if not path or path[0] == collection:
+                    return None
+            elif path[0] == collection:
+                keys.add(path[1])
+        return keys
+
+    def _mark(self, path: tuple) -> None:
+        if path not in self._changed:
+            self._changed[path] = True
+            self._order.append(("path", path))
+
+    def changes(self) -> list:
+        """Journal representation of everything this transaction did"""
+        changes = []
+        for entry in self._order:
+            path = entry[1]
+            if entry[0] == "append":
+                # Already contained in a full value written for this path or a parent
+                if any(path[:len(p)] == p for p in self._changed):
+                    continue
+                changes.append(["append", list(path), entry[2]])
+                continue
+            value = _get_path(self.data, path)
+            if value is _MISSING:
+                changes.append(["del", list(path)])
+            else:
+                changes.append(["set", list(path), value])
+        return changes
+
+    def rollback(self) -> None:
+        for action, path, old in reversed(self._undo):
+            if action == "pop":
+                _resolve(self.data, path).pop()
+                continue
+            parent = _resolve(self.data, path[:-1])
+            if old is _MISSING:
+                if isinstance(parent, dict):
+                    parent.pop(path[-1], None)
+                else:
+                    del parent[path[-1]]
+            else:
+                parent[path[-1]] = old
+
+
+class _Layered:
+    """
+    Read-only record id -> value mapping of a snapshot copy: a base dict
+    shared with earlier copies plus the entries changed since (None =
+    removed), so a copy costs the changed records rather than all of them.
+    """
+
+    __slots__ = ("base", "changes")
+
+    # Changes are folded into a fresh base once they outgrow this share of it
+    FOLD_RATIO = 8
+    FOLD_MIN = 64
+
+    def __init__(self, base: dict, changes: dict = None):
+        self.base = base
+        self.changes = changes or {}
+
+    @classmethod
+    def after(cls, previous, live: dict, record_ids) -> "_Layered":
+        """`previous` (a copy) with the values of `record_ids` taken from `live`"""
+        if not isinstance(previous, _Layered):
+            previous = _Layered(previous)
+        if len(previous.changes) + len(record_ids) > max(cls.FOLD_MIN, len(previous.base) // cls.FOLD_RATIO):
+            return _Layered(dict(live))
+        changes = dict(previous.changes)
+        for record_id in record_ids:
+            changes[record_id] = live.get(record_id)
+        return _Layered(previous.base, changes)
+
+    def get(self, record_id, default=None):
+        if record_id in self.changes:
+            value = self.changes[record_id]
+            return default if value is None else value
+        return self.base.get(record_id, default)
+
+    def values(self) -> list:
+        if not self.changes:
+            return list(self.base.values())
+        return [value for value in {**self.base, **self.changes}.values() if value is not None]
+
+
+class RecordIndex:
+    """
+    In-memory secondary indexes over one collection of the database, e.g.
+
+        RecordIndex("players", role=lambda p: p.get("role"))
+
+    maps each role to the ids of the players that have it. A field function
+    returns the key for a record, or None to leave the record out. Register
+    the index with DatabaseStore.add_index() and read it through
+    DatabaseStore.sync_index(); the store keeps it in step with every commit,
+    rollback and reload.
+    """
+
+    def __init__(self, collection: str, **fields):
+        self.collection = collection
+        self.fields = fields
+        self._maps = {name: {} for name in fields}  # field -> key -> {record id: None}
+        self._keys = {}                              # record id -> {field: key}
+
+    def rebuild(self, data: dict) -> None:
+        for mapping in self._maps.values():
+            mapping.clear()
+        self._keys.clear()
+        for record_id in data.get(self.collection, {}):
+            self.update(data, record_id)
+
+    def update(self, data: dict, record_id: str) -> None:
+        """Re-index one record after it changed (or was removed)"""
+        old = self._keys.pop(record_id, {})
+        record = data.get(self.collection, {}).get(record_id)
+        keys = {}
+        if isinstance(record, dict):
+            for name, field in self.fields.items():
+                key = field(record)
+                if key is not None:
+                    keys[name] = key
+
+        # Ids stay in the order they entered a key; an unchanged key keeps its place
+        for name, key in old.items():
+            if keys.get(name) != key:
+                ids = self._maps[name].get(key)
+                if ids is not None:
+                    ids.pop(record_id, None)
+                    if not ids:
+                        del self._maps[name][key]
+        for name, key in keys.items():
+            if old.get(name) != key:
+                self._maps[name].setdefault(key, {})[record_id] = None
+        if keys:
+            self._keys[record_id] = keys
+
+    def copy(self, previous: "RecordIndex" = None, record_ids=None) -> "RecordIndex":
+        """
+        Independent copy with the same contents (for a Snapshot). Given the
+        previous copy and the ids of the records changed since, only the
+        key lists those records left or joined are copied again.
+        """
+        clone = RecordIndex(self.collection, **self.fields)
+        if previous is None or record_ids is None:
+            clone._maps = {name: {key: dict(ids) for key, ids in mapping.items()} for name, mapping in self._maps.items()}
+            clone._keys = dict(self._keys)  # per-record key dicts are replaced, never changed
+            return clone
+
+        clone._maps = {name: dict(mapping) for name, mapping in previous._maps.items()}
+        clone._keys = _Layered.after(previous._keys, self._keys, record_ids)
+        for record_id in record_ids:
+            old, new = previous._keys.get(record_id, {}), self._keys.get(record_id, {})
+            for name in self.fields:
+                if old.get(name) == new.get(name):
+                    continue
+                for key in (old.get(name), new.get(name)):
+                    ids = self._maps[name].get(key)
+                    if ids:
+                        clone._maps[name][key] = dict(ids)
+                    else:
+                        clone._maps[name].pop(key, None)
+        return clone
+
+    def get(self, field: str, key) -> list:
+        """Ids of the records whose `field` is `key`"""
+        return list(self._maps[field].get(key, ()))
+
+    def keys(self, field: str) -> list:
+        """All distinct keys currently present for `field`"""
+        return list(self._maps[field])
+
+
+class RecordView:
+    """
+    Typed projection of one collection: record id -> factory(record id, record).
+
+    Registered and read like a RecordIndex (DatabaseStore.add_index() /
+    sync_index()), so only the records a commit or rollback touched are
+    converted again. Objects are replaced, never mutated, so a reference
+    obtained under the store lock stays a consistent snapshot of that record.
+    """
+
+    def __init__(self, collection: str, factory):
+        self.collection = collection
+        self.factory = factory
+        self._objects = {}
+
+    def rebuild(self, data: dict) -> None:
+        factory = self.factory
+        self._objects = {
+            record_id: factory(record_id, record)
+            for record_id, record in data.get(self.collection, {}).items()
+            if isinstance(record, dict)
+        }
+
+    def update(self, data: dict, record_id: str) -> None:
+        record = data.get(self.collection, {}).get(record_id)
+        if isinstance(record, dict):
+            self._objects[record_id] = self.factory(record_id, record)
+        else:
+            self._objects.pop(record_id, None)
+
+    def copy(self, previous: "RecordView" = None, record_ids=None) -> "RecordView":
+        """
+        Independent copy with the same contents (for a Snapshot). Given the
+        previous copy and the ids of the records changed since, it shares the
+        previous copy's objects and only the changed ones are added.
+        """
+        clone = RecordView(self.collection, self.factory)
+        if previous is None or record_ids is None:
+            clone._objects = dict(self._objects)
+        else:
+            clone._objects = _Layered.after(previous._objects, self._objects, record_ids)
+        return clone
+
+    def get(self, record_id: str):
+        return self._objects.get(record_id)
+
+    def values(self) -> list:
+        return list(self._objects.values())
+
+
+def _copy_paths(previous: dict, live: dict, paths) -> dict:
+    """
+    `previous` with the values at `paths` taken from `live`. Only the dicts
+    along each path are copied (shallowly) and the value at its end deeply;
+    everything else stays shared with `previous`. Lists are copied whole.
+    """
+    data = dict(previous)
+    fresh = {id(data)}  # dicts already copied for the new version
+    done = set()
+    for path in sorted(paths, key=len):
+        if not path:
+            return copy.deepcopy(live)
+        if any(path[:depth] in done for depth in range(1, len(path))):
+            continue  # a parent was copied whole
+        target, source = data, live
+        for depth, key in enumerate(path, 1):
+            if depth == len(path) or not isinstance(source.get(key), dict):
+                if key in source:
+                    target[key] = copy.deepcopy(source[key])
+                else:
+                    target.pop(key, None)
+                done.add(path[:depth])
+                break
+            child = target.get(key)
+            if not isinstance(child, dict):
+                target[key] = copy.deepcopy(source[key])
+                done.add(path[:depth])
+                break
+            if id(child) not in fresh:
+                child = target[key] = dict(child)
+                fresh.add(id(child))
+            target, source = child, source[key]
+    return data
+
+
+class Snapshot:
+    """
+    The committed database at one point in time, with its own copies of the
+    store's indexes. Never changed once published, so any number of threads
+    can read it without locking.
+    """
+
+    def __init__(self, data: dict, indexes: dict):
+        self.data = data
+        self.indexes = indexes  # index registered with the store -> frozen copy
+
+
+class DatabaseStore:
+    """
+    Keeps the whole database in memory and writes it back to disk in batches.
+
+    Reads are served from memory. Committed transactions are appended to the
+    journal (if one is configured) and mark the store dirty; a background
+    thread checkpoints dirty state every `flush_interval` seconds, so a burst
+    of changes costs a single full write. Pending changes are also flushed on
+    `close()` and at interpreter exit.
+
+    When `data_path` is given, transactions and checkpoints hold an advisory
+    lock on it and changes made by other processes are picked up by polling
+    its generation stamp and file stats (at most every `poll_interval` s).
+
+    Once a thread has asked for `reading()`, every commit also publishes a
+    Snapshot for queries that run without the lock.
+    """
+
+    def __init__(self, load_fn, save_fn, flush_interval: float = 5.0, journal_path: str = None,
+                 data_path: str = None, poll_interval: float = 2.0):
+        self._load_fn = load_fn
+        self._save_fn = save_fn
+        self.flush_interval = flush_interval
+        self.journal = Journal(journal_path) if journal_path else None
+        self.data_path = data_path
+        self.poll_interval = poll_interval
+        self._file_lock = FileLock(data_path + ".lock") if data_path else nullcontext()
+        self._lock = threading.RLock()
+        self._data = None
+        self._dirty = False
+        self._tx = None
+        self._stamp = None
+        self._seq = 0  # last journal sequence number in the in-memory state
+        self._last_poll = 0.0
+        self._listeners = []
+        self._indexes = []
+        self._log_writers = {}
+        self._pending_logs = []  # (logs, seq) whose write failed, retried before the next checkpoint
+        self._foreign_logs = False  # the journal has side log items only another process can write
+        self._snapshot = None
+        self._publishing = False  # snapshots are only kept up to date once someone reads them
+        self._reader = threading.local()
+        self._last_read_poll = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    @property
+    def lock(self):
+        """The store lock; inside reading() nothing needs it, so a no-op stands in"""
+        if getattr(self._reader, "snapshot", None) is not None:
+            return nullcontext()
+        return self._lock
+
+    @property
+    def data(self) -> dict:
+        """The live database dict, loaded from disk on first access (the snapshot's inside reading())"""
+        snapshot = getattr(self._reader, "snapshot", None)
+        if snapshot is not None:
+            return snapshot.data
+        with self._lock:
+            if self._data is None:
+                with self._file_lock:
+                    self._data = self._load()
+                    self._stamp = self._disk_stamp()
+                self._rebuild_indexes()
+                if self._dirty:
+                    self._ensure_flusher()
+                self._publish()
+            else:
+                self.refresh_if_changed()
+            if self._publishing and self._snapshot is None:
+                self._publish()
+            return self._data
+
+    @property
+    def reading_snapshot(self):
+        """The Snapshot this thread is reading from, or None outside reading()"""
+        return getattr(self._reader, "snapshot", None)
+
+    @contextmanager
+    def reading(self):
+        """
+        Serve this thread's queries from the latest Snapshot: inside the block
+        `data` and `sync_index()` return its frozen copies and `lock` is not
+        taken, so code written against the live store runs unchanged and
+        never waits for a writer. Raises SnapshotUnavailable when the query
+        has to run under the lock instead: before the first snapshot, when
+        another process changed the files, or when it tries to change data.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or self._changed_on_disk():
+            self._publishing = True
+            raise SnapshotUnavailable("no current snapshot")
+        self._reader.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._reader.snapshot = None
+
+    def _changed_on_disk(self) -> bool:
+        # Lock-free poll for readers; reloading is left to whoever holds the lock
+        if self.data_path is None:
+            return False
+        now = time.monotonic()
+        if now - self._last_read_poll < self.poll_interval:
+            return False
+        self._last_read_poll = now
+        return self._disk_stamp() != self._stamp
+
+    def _publish(self, tx: Transaction = None) -> None:
+        """Publish the committed state as a new Snapshot (only what `tx` changed is copied)"""
+        if not self._publishing:
+            return
+        previous = self._snapshot
+        if tx is None or previous is None:
+            self._snapshot = Snapshot(copy.deepcopy(self._data), {index: index.copy() for index in self._indexes})
+            return
+        indexes = {}
+        for index in self._indexes:
+            record_ids = tx.touched(index.collection)
+            if index not in previous.indexes:
+                indexes[index] = index.copy()
+            elif record_ids == set():
+                indexes[index] = previous.indexes[index]
+            else:
+                indexes[index] = index.copy(previous.indexes[index], record_ids)
+        paths = {entry[1] for entry in tx._order}
+        self._snapshot = Snapshot(_copy_paths(previous.data, self._data, paths), indexes)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    @property
+    def generation(self) -> int:
+        return read_generation(self.data_path) if self.data_path else 0
+
+    def add_index(self, index: RecordIndex) -> None:
+        """Keep `index` up to date with this store from now on"""
+        with self._lock:
+            self._indexes.append(index)
+            if self._data is not None:
+                index.rebuild(self._data)
+
+    def sync_index(self, index: RecordIndex) -> RecordIndex:
+        """Return `index` brought up to date, including changes of a running transaction"""
+        snapshot = getattr(self._reader, "snapshot", None)
+        if snapshot is not None:
+            return snapshot.indexes[index]
+        with self._lock:
+            self.data  # loads on first use and picks up other processes' changes
+            if self._tx is not None:
+                self._reindex(self._tx)
+            return index
+
+    def _rebuild_indexes(self) -> None:
+        for index in self._indexes:
+            index.rebuild(self._data)
+
+    def _reindex(self, tx: Transaction) -> None:
+        for index in self._indexes:
+            keys = tx.touched(index.collection)
+            if keys is None:
+                index.rebuild(self._data)
+            else:
+                for key in keys:
+                    index.update(self._data, key)
+
+    def add_log(self, name: str, writer) -> None:
+        """
+        Register the writer of a side log: `writer(items, seq, replay)`
+        appends the items one transaction queued with Transaction.write_log()
+        (`seq` is its journal sequence number). When the journal is replayed
+        after a crash, or a failed write is retried, the same items come again
+        with `replay=True` and the writer must skip the ones it already has.
+        A store without a writer for a log (another bot sharing the files)
+        leaves journal records with its items for the process that has one.
+        """
+        self._log_writers[name] = writer
+
+    def _write_logs(self, logs: dict, seq, replay: bool = False) -> None:
+        if any(name not in self._log_writers for name in logs):
+            self._foreign_logs = True
+        try:
+            self._call_writers(logs, seq, replay)
+        except Exception as e:
+            # Still in the journal: retried before the next checkpoint truncates it
+            print(f"❌ Error writing {', '.join(logs)} log entries: {e}")
+            self._pending_logs.append((logs, seq))
+
+    def _retry_logs(self) -> None:
+        while self._pending_logs:
+            logs, seq = self._pending_logs[0]
+            self._call_writers(logs, seq, True)
+            self._pending_logs.pop(0)
+
+    def _call_writers(self, logs: dict, seq, replay: bool) -> None:
+        for name, items in logs.items():
+            writer = self._log_writers.get(name)
+            if writer:
+                writer(items, seq, replay)
+
+    def add_reload_listener(self, callback) -> None:
+        """Call `callback(data)` whenever the database is re-read because another process changed it"""
+        self._listeners.append(callback)
+
+    def refresh_if_changed(self, force: bool = False) -> bool:
+        """
+        Re-read the database if another process changed it since we last
+        looked. Returns True if the in-memory view was replaced.
+        """
+        if self.data_path is None or self._data is None or self._tx is not None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return False
+        self._last_poll = now
+
+        with self._lock:
+            if self._disk_stamp() == self._stamp:
+                return False
+            with self._file_lock:
+                # Our own committed changes are in the journal, so nothing is lost
+                self._data = self._load(quiet=True)
+                self._stamp = self._disk_stamp()
+            self._rebuild_indexes()
+            self._publish()
+            for callback in self._listeners:
+                callback(self._data)
+            return True
+
+    def _disk_stamp(self) -> tuple:
+        if self.data_path is None:
+            return None
+        # The -wal file only exists for SQLite storage
+        paths = [self.data_path, self.data_path + "-wal"]
+        if self.journal:
+            paths.append(self.journal.path)
+        stamp = [read_generation(self.data_path)]
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _committed(self) -> None:
+        """Publish a change made under the file lock to other processes"""
+        if self.data_path:
+            bump_generation(self.data_path)
+            self._stamp = self._disk_stamp()
+
+    def _load(self, quiet: bool = False) -> dict:
+        data = self._load_fn()
+        if self.journal:
+            self._seq = data.get(JOURNAL_SEQ_KEY, 0)
+            self._foreign_logs = False
+            replayed = 0
+            for record in self.journal.read():
+                seq = record.get("seq")
+                if record.get("logs"):
+                    # Even when the checkpoint has the change: the writers skip what they already have
+                    self._write_logs(record["logs"], seq, replay=True)
+                if seq is not None and seq <= self._seq:
+                    continue  # already in the checkpoint (crash before the journal was truncated)
+                apply_changes(data, record.get("changes", []))
+                self._seq = seq if seq is not None else self._seq
+                replayed += 1
+            if replayed and not quiet:
+                print(f"♻️ Replayed {replayed} journal record(s) from {self.journal.path}")
+                self._dirty = True
+        return data
+
+    @contextmanager
+    def transaction(self, op: str):
+        """
+        Run a unit of work: either everything it changed is committed and
+        journaled, or (if the block raises) all of it is rolled back.
+        Nested transactions join the outermost one.
+        """
+        if getattr(self._reader, "snapshot", None) is not None:
+            raise SnapshotUnavailable(f"{op} changes the database")
+        with self._lock:
+            if self._tx is not None:
+                yield self._tx
+                return
+
+            with self._file_lock:
+                # Work on the latest state, including other processes' changes
+                self.refresh_if_changed(force=True)
+                tx = Transaction(self.data, op)
+                self._tx = tx
+                try:
+                    yield tx
+                except BaseException:
+                    tx.rollback()
+                    self._reindex(tx)
+                    raise
+                finally:
+                    self._tx = None
+
+                if tx.changed:
+                    if self.journal:
+                        record = {"seq": self._seq + 1, "op": op, "ts": datetime.now().isoformat(),
+                                  "changes": tx.changes()}
+                        if tx._logs:
+                            record["logs"] = tx._logs
+                        try:
+                            self.journal.append(record)
+                        except BaseException:
+                            tx.rollback()
+                            self._reindex(tx)
+                            raise
+                        self._seq += 1
+                    if tx._logs:
+                        self._write_logs(tx._logs, self._seq if self.journal else None)
+                    self._reindex(tx)
+                    if tx._order:
+                        self._publish(tx)
+                    self._dirty = True
+                    self._committed()
+                for callback in tx._after_commit:
+                    try:
+                        callback()
+                    except Exception as e:
+                        # The data change itself is already committed
+                        print(f"❌ Error after committing {op}: {e}")
+            if tx.changed:
+                self._ensure_flusher()
+
+    def replace(self, data: dict) -> None:
+        """Swap the in-memory database for a different dict"""
+        with self._lock:
+            self._data = data
+            self._rebuild_indexes()
+            self._publish()
+
+    def mark_dirty(self) -> None:
+        """Schedule the current state (possibly changed in place) for the next checkpoint"""
+        with self._lock:
+            self._publish()
+            self._dirty = True
+            self._ensure_flusher()
+
+    def flush(self) -> bool:
+        """Checkpoint pending changes to disk now. Returns True if anything was written."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return False
+            with self._file_lock:
+                self.refresh_if_changed(force=True)
+                # Side log items still only in the journal must be written before it is truncated
+                self._retry_logs()
+                if self.journal:
+                    self._data[JOURNAL_SEQ_KEY] = self._seq
+                self._save_fn(self._data)
+                if self.journal and not self._foreign_logs:
+                    # (otherwise the process that owns those logs truncates it once it has seen them)
+                    self.journal.truncate()
+                self._dirty = False
+                self._committed()
+                return True
+
+    def reload(self) -> dict:
+        """Drop the in-memory copy (flushing it first) and read it again from disk"""
+        with self._lock:
+            self.flush()
+            self._data = None
+            return self.data
+
+    def close(self) -> None:
+        """Stop the background flusher and write out anything still pending"""
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Error flushing database on shutdown: {e}")
+
+    def _ensure_flusher(self) -> None:
+        if self.flush_interval <= 0:
+            # Write-behind disabled: persist immediately
+            self.flush()
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="database-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Error flushing database: {e}")
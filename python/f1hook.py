@@ -4,12 +4,46 @@ import pytesseract
 import numpy as np
 import os
 import re
+import shlex
+import subprocess
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ocr_cache import OcrCache
 
 # === KONFIGURACE ===
 WEBHOOK_URL = "https://discord.com/api/webhooks/1459845337597608048/txV_pv-TeHdzLrR7f_P7LTOy489HhcubX-9VAhSmVNGxDSsQd2ka-8dRe1z5ynoOK99l"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")  # Co bere dávkový režim z adresáře
+
+# Předzpracování a OCR (součást klíče cache - změna = nové čtení)
+UPSCALE = 3
+THRESHOLD = 160
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+PARSER_VERSION = 3  # Zvedni při změně čtení řádků, ať se staré řádky z cache nepoužijí
+ROI_DETECTION = True  # Zvětšovat a číst jen oblast tabulky výsledků, ne celý screenshot
+ROI_DETECT_WIDTH = 800  # Šířka zmenšené kopie, na které se tabulka hledá
+ROI_MIN_ROWS = 3  # Méně pravidelných řádků = tabulka nenalezena, čte se celý obrázek
+
+# Čtení po buňkách: tabulka se rozřeže na řádky a sloupce, každá buňka se čte zvlášť
+CELL_OCR = True  # False = celý blok textu najednou + parse_line_improved
+CELL_OCR_THREADS = os.cpu_count() or 4  # Tesseract běží jako samostatný proces, vlákna stačí
+TABLE_COLUMNS = ("driver", "team", "grid", "stops", "best", "gap", "points")  # Sloupce výsledků F1 25 zleva
+COLUMN_MIN_GAP = 1.5  # Mezera mezi sloupci = aspoň tolik výšek řádku
+CELL_CONFIGS = {  # Jen tyto sloupce se čtou; "position" jen když je v tabulce vidět
+    "position": "--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789",
+    "driver": "--oem 3 --psm 7",
+    "team": "--oem 3 --psm 7",
+    "best": "--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789:.",
+    "gap": "--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789:.+LapsDNF",
+}
+
+# Cache výsledků podle obsahu obrázku (opakovaný upload stejného screenshotu)
+OCR_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ocr_cache")
+OCR_CACHE_MAX_BYTES = 50 * 1024 * 1024
+_cache = OcrCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES)
 
 def parse_line_improved(line):
     """Rozdělí řádek na Driver (2 slova), Team (zbytek před čísly) a časy."""
@@ -31,22 +65,210 @@ def parse_line_improved(line):
         return [driver, team, best_time, gap]
     return None
 
-def process_ocr_to_fancy_table(image_path):
+def read_rows(image_path):
+    """OCR jednoho screenshotu -> seznam řádků {position, driver, team, best, gap}. Chyby hlásí ValueError."""
     if not os.path.exists(image_path):
-        return f"Chyba: Soubor {image_path} nenalezen."
+        raise ValueError(f"Chyba: Soubor {image_path} nenalezen.")
+
+    with open(image_path, "rb") as f:
+        data = f.read()
+    key = _cache.key(data, {"upscale": UPSCALE, "threshold": THRESHOLD, "tesseract": TESSERACT_CONFIG,
+                            "parser": PARSER_VERSION, "roi": ROI_DETECTION,
+                            "cells": CELL_OCR and {"columns": TABLE_COLUMNS, "configs": CELL_CONFIGS}})
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached["rows"]
 
-    img = cv2.imread(image_path)
+    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
     if img is None:
-        return "Chyba: Nepodařilo se načíst obrázek (OpenCV)."
+        raise ValueError("Chyba: Nepodařilo se načíst obrázek (OpenCV).")
+
+    raw_text, rows = recognize(img, ROI_DETECTION, CELL_OCR)
+    _cache.put(key, {"raw_text": raw_text, "rows": rows})
+    return rows
+
+def _text_mask(img):
+    # Text tabulky je světlý na tmavém pozadí - stejný práh jako pro OCR
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) > 255 - THRESHOLD
+
+def _table_rows(mask):
+    """Pásy řádků tabulky [(y0, y1)]: nejdelší sled textových pásů s pravidelným rozestupem."""
+    lit = mask.sum(axis=1) >= max(2, mask.shape[1] // 100)
+    bands, start = [], None
+    for y, on in enumerate(np.append(lit, False)):
+        if on and start is None:
+            start = y
+        elif not on and start is not None:
+            if y - start >= 3:
+                bands.append((start, y))
+            start = None
+
+    best, run = bands[:1], bands[:1]
+    for prev, cur in zip(bands, bands[1:]):
+        pitch = cur[0] - prev[0]
+        if len(run) > 1 and abs(pitch - (run[1][0] - run[0][0])) <= 0.3 * (run[1][0] - run[0][0]):
+            run.append(cur)
+        else:
+            run = [prev, cur]
+        if len(run) > len(best):
+            best = list(run)
+    return best
+
+def find_table_roi(img):
+    """
+    Najde tabulku výsledků: nejdelší sled textových řádků s pravidelným
+    rozestupem (nadpisy a tlačítka okolo mají jiný). Hledá se na zmenšené
+    kopii; vrací (x, y, w, h) v souřadnicích img, nebo None.
+    """
+    scale = min(1.0, ROI_DETECT_WIDTH / img.shape[1])
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else img
+    mask = _text_mask(small)
+    best = _table_rows(mask)
+    if len(best) < ROI_MIN_ROWS:
+        return None
+
+    pad = (best[1][0] - best[0][0]) // 2
+    y0, y1 = max(0, best[0][0] - pad), min(small.shape[0], best[-1][1] + pad)
+    cols = np.flatnonzero(mask[y0:y1].any(axis=0))
+    x0, x1 = max(0, cols[0] - pad), min(small.shape[1], cols[-1] + 1 + pad)
+    return int(x0 / scale), int(y0 / scale), int(np.ceil((x1 - x0) / scale)), int(np.ceil((y1 - y0) / scale))
 
-    # Vylepšení obrazu
-    img = cv2.resize(img, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+def crop_table(img):
+    box = find_table_roi(img)
+    if not box:
+        return img
+    x, y, w, h = box
+    return img[y:y + h, x:x + w]
+
+def segment_table(img):
+    """
+    Rozřeže tabulku na buňky: pásy řádků a sloupce oddělené širokými
+    mezerami (sloupec = místa, kde má text aspoň čtvrtina řádků, takže
+    zvýrazněný řádek hráče hranice nerozbije). Sloupce se pojmenují podle
+    TABLE_COLUMNS, případně s "position" navíc vlevo. Vrací (řádky
+    [(y0, y1)], sloupce {jméno: (x0, x1)}), nebo None, když tabulka
+    neodpovídá.
+    """
+    mask = _text_mask(img)
+    rows = _table_rows(mask)
+    if len(rows) < ROI_MIN_ROWS:
+        return None
+
+    row_height = float(np.median([y1 - y0 for y0, y1 in rows]))
+    xs = np.flatnonzero(np.mean([mask[y0:y1].any(axis=0) for y0, y1 in rows], axis=0) >= 0.25)
+    if xs.size == 0:
+        return None
+    spans, start = [], xs[0]
+    for prev, x in zip(xs, xs[1:]):
+        if x - prev > COLUMN_MIN_GAP * row_height:
+            spans.append((start, prev + 1))
+            start = x
+    spans.append((start, xs[-1] + 1))
+
+    if len(spans) == len(TABLE_COLUMNS):
+        names = TABLE_COLUMNS
+    elif len(spans) == len(TABLE_COLUMNS) + 1:
+        names = ("position",) + TABLE_COLUMNS
+    else:
+        return None
+
+    # Hranice buněk v půlce mezer, ať se vejde i jméno delší než u většiny řádků
+    edges = [0] + [(a[1] + b[0]) // 2 for a, b in zip(spans, spans[1:])] + [img.shape[1]]
+    columns = {name: (int(edges[i]), int(edges[i + 1])) for i, name in enumerate(names)}
+
+    # Řádky se roztáhnou do půlky mezery k sousedům
+    pad = max(1, (rows[1][0] - rows[0][1]) // 2) if len(rows) > 1 else 2
+    rows = [(max(0, y0 - pad), min(img.shape[0], y1 + pad)) for y0, y1 in rows]
+    return rows, columns
+
+def _binarize(img):
+    # Vylepšení obrazu (převod na šedou před zvětšením = třetina práce pro INTER_CUBIC)
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, None, fx=UPSCALE, fy=UPSCALE, interpolation=cv2.INTER_CUBIC)
     gray = cv2.bitwise_not(gray)
-    _, thresh = cv2.threshold(gray, 160, 255, cv2.THRESH_BINARY)
+    _, thresh = cv2.threshold(gray, THRESHOLD, 255, cv2.THRESH_BINARY)
+    return thresh
+
+def preprocess(img, roi=True):
+    """Ořez na tabulku, zvětšení a práh -> binární obrázek pro Tesseract."""
+    return _binarize(crop_table(img) if roi else img)
 
-    # OCR
-    raw_text = pytesseract.image_to_string(thresh, config=r'--oem 3 --psm 6')
+def _read_cell(args):
+    cell, column, env = args
+    _, png = cv2.imencode(".png", _binarize(cell))
+    # Tesseract přímo (obrázek na stdin, text na stdout), ať jde limit vláken jen tomuto procesu
+    cmd = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout"] + shlex.split(CELL_CONFIGS[column], posix=os.name != "nt")
+    try:
+        proc = subprocess.run(cmd, input=png.tobytes(), capture_output=True, env=env,
+                              creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", "replace").strip())
+    return proc.stdout.decode("utf-8", "replace").strip()
+
+def _row_from_cells(index, cells):
+    """Buňky jednoho řádku -> řádek výsledků, nebo None, když to není řádek jezdce (záhlaví, šum)."""
+    driver = re.sub(r'[|@_~—;]', '', cells.get("driver", "")).strip()
+    best = re.search(r'\d:\d{2}\.\d{3}', cells.get("best", ""))
+    gap = re.search(r'\+?\d{1,2}:\d{2}\.\d{3}|\+\d{1,3}\.\d{3}|\+\d+ ?Laps?|DNF', cells.get("gap", ""))
+    position = cells.get("position", "")
+    # Bez nejlepšího času (DNF, žádné kolo) řádek zůstává, pokud má pozici nebo odstup
+    if not driver or not (best or gap or position.isdigit()):
+        return None
+    return {
+        "position": int(position) if position.isdigit() else index,
+        "driver": driver,
+        "team": re.sub(r'[|@_~—;]', '', cells.get("team", "")).strip() or "---",
+        "best": best.group(0) if best else "---",
+        "gap": gap.group(0) if gap else "---",
+    }
+
+def recognize_cells(img):
+    """OCR po buňkách paralelně -> (raw text, řádky), nebo None, když se tabulka nedá rozřezat."""
+    segments = segment_table(img)
+    if segments is None:
+        return None
+    rows, columns = segments
+    wanted = [name for name in columns if name in CELL_CONFIGS]
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")  # buňky běží souběžně, ať si Tesseract nebere všechna jádra
+    jobs = [(img[y0:y1, columns[name][0]:columns[name][1]], name, env) for y0, y1 in rows for name in wanted]
+
+    with ThreadPoolExecutor(max_workers=CELL_OCR_THREADS) as pool:
+        texts = list(pool.map(_read_cell, jobs))
+
+    lines, parsed = [], []
+    for i in range(len(rows)):
+        cells = dict(zip(wanted, texts[i * len(wanted):(i + 1) * len(wanted)]))
+        lines.append("\t".join(cells.values()))
+        row = _row_from_cells(parsed[-1]["position"] + 1 if parsed else 1, cells)
+        if row:
+            parsed.append(row)
+    return "\n".join(lines), parsed[:20]
+
+def recognize(img, roi=True, cells=False):
+    """OCR načteného obrázku -> (raw text, řádky {position, driver, team, best, gap})."""
+    table = crop_table(img) if roi else img
+    if cells:
+        result = recognize_cells(table)
+        if result is not None:
+            return result
+
+    raw_text = pytesseract.image_to_string(_binarize(table), config=TESSERACT_CONFIG)
+
+    rows = []
+    for line in raw_text.splitlines():
+        parsed = parse_line_improved(line)
+        if parsed:
+            driver, team, best, gap = parsed
+            rows.append({"position": len(rows) + 1, "driver": driver, "team": team, "best": best, "gap": gap})
+            if len(rows) >= 20: break
+    return raw_text, rows
+
+def format_table(rows, title="🏎️ F1 RACE RESULTS"):
+    """Naformátuje řádky do textové tabulky pro Discord."""
+    if not rows:
+        return "⚠️ Nepodařilo se rozpoznat data v tabulce."
 
     # Nastavení šířek sloupců
     w_pos, w_driver, w_team, w_best, w_gap = 3, 20, 20, 10, 10
@@ -54,34 +276,90 @@ def process_ocr_to_fancy_table(image_path):
     header = f"| {'P':<{w_pos}} | {'DRIVER':<{w_driver}} | {'TEAM':<{w_team}} | {'BEST':<{w_best}} | {'GAP':<{w_gap}} |"
 
     table_rows = []
-    current_pos = 1
+    for r in rows:
+        pos, dr, tm, bt, gp = r["position"], r["driver"], r["team"], r["best"], r["gap"]
+        row = f"| {pos:>{w_pos}} | {dr[:w_driver]:<{w_driver}} | {tm[:w_team]:<{w_team}} | {bt:<{w_best}} | {gp:<{w_gap}} |"
+        table_rows.append(row)
 
-    for line in raw_text.splitlines():
-        parsed = parse_line_improved(line)
-        if parsed:
-            dr, tm, bt, gp = parsed
-            row = f"| {current_pos:>{w_pos}} | {dr[:w_driver]:<{w_driver}} | {tm[:w_team]:<{w_team}} | {bt:<{w_best}} | {gp:<{w_gap}} |"
-            table_rows.append(row)
-            current_pos += 1
-            if current_pos > 20: break
+    return f"```text\n{title}\n{sep}\n{header}\n{sep}\n" + "\n".join(table_rows) + f"\n{sep}\n```"
 
-    if not table_rows:
-        return "⚠️ Nepodařilo se rozpoznat data v tabulce."
+def process_ocr_to_fancy_table(image_path):
+    try:
+        return format_table(read_rows(image_path))
+    except ValueError as e:
+        return str(e)
 
-    return f"```text\n🏎️ F1 RACE RESULTS\n{sep}\n{header}\n{sep}\n" + "\n".join(table_rows) + f"\n{sep}\n```"
+# === DÁVKOVÉ ZPRACOVÁNÍ (víc screenshotů jednoho závodu) ===
+
+def _timed_rows(image_path):
+    """Spouští se v procesu z poolu: (cesta, řádky, chyba, sekundy)."""
+    started = time.perf_counter()
+    try:
+        return image_path, read_rows(image_path), None, time.perf_counter() - started
+    except (ValueError, OSError, cv2.error, pytesseract.TesseractError, pytesseract.TesseractNotFoundError) as e:
+        # Chyba jednoho obrázku (poškozený soubor, pád Tesseractu) nesmí shodit celou dávku
+        return image_path, [], str(e) or type(e).__name__, time.perf_counter() - started
+
+def collect_images(paths):
+    """Rozbalí adresáře na obrázky (podle názvu = pořadí stránek), soubory nechá, jak jsou."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                       if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            images.append(path)
+    return images
+
+def merge_pages(pages):
+    """Spojí stránky do jedné klasifikace; řádek z překryvu dvou stránek (stejná pozice i jezdec) se počítá jednou."""
+    merged, seen = [], set()
+    for rows in pages:
+        for row in rows:
+            name = re.sub(r'\W+', '', row["driver"]).casefold()
+            key = (row["position"], name)
+            if name and key not in seen:
+                seen.add(key)
+                merged.append(row)
+    return merged
+
+def process_batch(paths, workers=None):
+    """OCR všech obrázků paralelně (jeden proces na jádro) -> (sloučené řádky, časy po obrázcích)."""
+    images = collect_images(paths)
+    if not images:
+        return [], []
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(images))) as pool:
+        results = list(pool.map(_timed_rows, images))  # map drží pořadí stránek
+    timings = [{"image": path, "rows": len(rows), "error": error, "seconds": round(seconds, 3)}
+               for path, rows, error, seconds in results]
+    return merge_pages(rows for _, rows, _, _ in results), timings
+
+def send_to_discord(content):
+    """Pošle text přes webhook, vrací HTTP status."""
+    r = requests.post(WEBHOOK_URL, json={"content": content})
+    return r.status_code
 
 if __name__ == "__main__":
     # PHP posílá cestu k souboru jako první argument
-    soubor = sys.argv[1] if len(sys.argv) > 1 else "obrazek.png"
+    # Dávka: py f1hook.py --batch slozka_nebo_obrazky...
+    if len(sys.argv) > 2 and sys.argv[1] == "--batch":
+        started = time.perf_counter()
+        rows, timings = process_batch(sys.argv[2:])
+        for t in timings:
+            stav = t["error"] or f"{t['rows']} řádků"
+            print(f"⏱️ {os.path.basename(t['image'])}: {t['seconds']:.2f} s ({stav})")
+        print(f"Celkem {len(timings)} obrázků za {time.perf_counter() - started:.2f} s, {len(rows)} jezdců")
+        vysledek = format_table(rows)
+    else:
+        soubor = sys.argv[1] if len(sys.argv) > 1 else "obrazek.png"
 
-    print(f"Analyzuji: {soubor}")
-    vysledek = process_ocr_to_fancy_table(soubor)
+        print(f"Analyzuji: {soubor}")
+        vysledek = process_ocr_to_fancy_table(soubor)
 
     # Odeslání na Discord
-    payload = {"content": vysledek}
-    r = requests.post(WEBHOOK_URL, json=payload)
+    status = send_to_discord(vysledek)
 
-    if r.status_code == 204:
+    if status == 204:
         print("Úspěšně odesláno na Discord.")
     else:
-        print(f"Chyba Webhooku: {r.status_code}")
+        print(f"Chyba Webhooku: {status}")
@@ -0,0 +1,71 @@
+"""
+Cache výsledků OCR na disku, klíčovaná obsahem obrázku
+
+Klíč = SHA-256 bajtů obrázku + parametry předzpracování a konfigurace
+Tesseractu, takže stejný screenshot nahraný znovu (i pod jiným jménem) se
+vrátí hned, ale změna nastavení OCR cache obejde. Každý záznam je jeden
+JSON soubor (raw text + rozpoznané řádky); při překročení limitu velikosti
+se mažou nejdéle nepoužité záznamy (LRU podle času posledního přístupu).
+"""
+import hashlib
+import json
+import os
+import threading
+
+
+class OcrCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(image_bytes, params):
+        """Klíč záznamu: hash obrázku + hash parametrů OCR."""
+        digest = hashlib.sha256(image_bytes)
+        digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Uložený záznam nebo None; zásah posune záznam na konec LRU."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # čas přístupu pro LRU
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)  # souběžní workeři nikdy nečtou napůl zapsaný soubor
+        self._evict()
+
+    def _evict(self):
+        """Smaže nejdéle nepoužité záznamy, dokud se cache nevejde do limitu."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    try:
+                        st = os.stat(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        continue  # mezitím smazal jiný proces
+                    entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
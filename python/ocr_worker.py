@@ -0,0 +1,132 @@
+"""
+OCR worker - dlouho běžící služba místo spouštění f1hook.py pro každý upload
+
+cv2, numpy, pytesseract a requests se načtou jednou při startu, upload.php
+jen pošle cestu k obrázku a hned dostane ID úlohy. Úlohy zpracovává fronta
+ve vlákně na pozadí, stav se dá kdykoli zjistit.
+
+    python ocr_worker.py [port]
+
+    POST /jobs          {"path": "C:/.../uploads/123_foto.png"}  -> 202 {"job_id", "status"}
+    GET  /jobs/<job_id> -> {"job_id", "status": queued|running|done|failed, "result", ...}
+    GET  /health        -> {"ok": true, "queued": N}
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import f1hook  # natáhne cv2/numpy/pytesseract/requests jen jednou
+
+# === KONFIGURACE ===
+HOST = "127.0.0.1"  # Jen lokálně - upload.php běží na stejném stroji
+PORT = 8765
+MAX_FINISHED_JOBS = 200  # Kolik hotových úloh si pamatovat pro dotazy na stav
+SEND_TO_DISCORD = True  # Výsledek rovnou poslat na webhook (jako f1hook.py)
+
+_jobs = OrderedDict()  # job_id -> stav úlohy
+_jobs_lock = threading.Lock()
+_queue = queue.Queue()
+
+
+def submit(image_path):
+    """Zařadí obrázek do fronty, vrací ID úlohy."""
+    job_id = uuid.uuid4().hex[:12]
+    with _jobs_lock:
+        _jobs[job_id] = {"job_id": job_id, "status": "queued", "path": image_path, "submitted_at": time.time()}
+        _forget_old_jobs()
+    _queue.put(job_id)
+    return job_id
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _forget_old_jobs():
+    finished = [jid for jid, job in _jobs.items() if job["status"] in ("done", "failed")]
+    for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[jid]
+
+
+def _update(job_id, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+
+def _worker():
+    """Zpracovává úlohy z fronty jednu po druhé."""
+    while True:
+        job_id = _queue.get()
+        job = get_job(job_id)
+        started = time.time()
+        _update(job_id, status="running", started_at=started)
+        try:
+            # read_rows hlásí chyby výjimkou -> úloha "failed" s textem v "error"
+            result = f1hook.format_table(f1hook.read_rows(job["path"]))
+            webhook = f1hook.send_to_discord(result) if SEND_TO_DISCORD else None
+            _update(job_id, status="done", result=result, webhook_status=webhook,
+                    ocr_seconds=round(time.time() - started, 3))
+        except Exception as e:
+            _update(job_id, status="failed", error=str(e))
+            print(f"❌ Úloha {job_id} selhala: {e}")
+        finally:
+            _update(job_id, finished_at=time.time())
+            _queue.task_done()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, code, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self._reply(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            image_path = json.loads(self.rfile.read(length) or b"{}").get("path")
+        except (ValueError, AttributeError):
+            return self._reply(400, {"error": "body must be JSON with a path"})
+        if not image_path or not os.path.isfile(image_path):
+            return self._reply(400, {"error": f"file not found: {image_path}"})
+        job_id = submit(os.path.abspath(image_path))
+        self._reply(202, {"job_id": job_id, "status": "queued"})
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._reply(200, {"ok": True, "queued": _queue.qsize()})
+        if self.path.startswith("/jobs/"):
+            job = get_job(self.path[len("/jobs/"):])
+            return self._reply(200, job) if job else self._reply(404, {"error": "unknown job"})
+        self._reply(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass  # bez výpisu každého dotazu na stav
+
+
+def serve(host=HOST, port=PORT):
+    threading.Thread(target=_worker, name="ocr-worker", daemon=True).start()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"✅ OCR worker běží na http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else PORT)
@@ -403,6 +403,11 @@ class RegistrationBot(discord.Client):
         except Exception as e:
             print(f"❌ Error syncing: {e}")
 
+    async def close(self):
+        # Write out any batched database changes before disconnecting
+        database.close_database()
+        await super().close()
+
     async def on_interaction(self, interaction: discord.Interaction):
         # Handle Persistent Trial Logic via specific custom_id pattern
         if interaction.type == discord.InteractionType.component:
@@ -0,0 +1,79 @@
+"""
+JSON codec for everything the bots keep on disk
+
+Uses orjson or msgspec when one of them is installed and the standard
+library otherwise; all three produce the same JSON. Output is compact UTF-8
+by default, pretty=True gives the indented form for exports and for files
+people read by hand.
+
+Pretty-print a compact file on demand:
+    python codec.py players.json [players.pretty.json]
+"""
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKEND = "orjson" if orjson else "msgspec" if msgspec else "json"
+
+
+def dumps(value, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Encode to a JSON string (compact unless pretty)"""
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(value, option=option).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles those
+    elif msgspec:
+        try:
+            data = msgspec.json.encode(value, order="sorted" if sort_keys else None)
+            if pretty:
+                data = msgspec.json.format(data, indent=2)
+            return data.decode("utf-8")
+        except (TypeError, msgspec.EncodeError):
+            pass
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2, sort_keys=sort_keys)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+
+
+def loads(data):
+    """Decode JSON from str or bytes; malformed input raises ValueError"""
+    if orjson:
+        return orjson.loads(data)  # orjson.JSONDecodeError is a ValueError
+    if msgspec:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def load_file(path: str):
+    """Decode a whole JSON file"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python codec.py input.json [output.json]")
+    text = dumps(load_file(sys.argv[1]), pretty=True) + "\n"
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
@@ -1,37 +1,59 @@
-import json
 import os
 import datetime
+import codec
+from storage import DatabaseStore, RecordIndex, atomic_write_text
 
 DB_FILE = "players.json"
 
-def load_database():
+def _read_database_file():
     if not os.path.exists(DB_FILE):
         return {"players": {}}
     try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return codec.load_file(DB_FILE)
     except Exception as e:
         print(f"❌ Error loading database: {e}")
         return {"players": {}}
 
+def _write_database_file(data):
+    atomic_write_text(DB_FILE, codec.dumps(data))
+
+# Shared with the other bots: writes are locked and journaled, and changes
+# made by other processes are picked up automatically.
+_store = DatabaseStore(_read_database_file, _write_database_file, flush_interval=30,
+                       journal_path=DB_FILE + ".journal", data_path=DB_FILE)
+
+# Players by role and by the team drivers picked in their application
+_players_index = RecordIndex(
+    "players",
+    role=lambda p: p.get("role"),
+    team=lambda p: (p.get("answers") or {}).get("team") if p.get("role") == "driver" else None
+)
+_store.add_index(_players_index)
+
+def load_database():
+    return _store.data
+
 def save_database(data):
     try:
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        with _store.transaction("save_database") as tx:
+            tx.put_document(data)
+        _store.flush()
     except Exception as e:
         print(f"❌ Error saving database: {e}")
 
+def close_database():
+    _store.close()
+
 def register_player(user_id, username, role, answers):
-    db = load_database()
     user_id_str = str(user_id)
     
-    db["players"][user_id_str] = {
-        "username": username,
-        "role": role,
-        "answers": answers,
-        "registered_at": datetime.datetime.now().isoformat()
-    }
-    save_database(db)
+    with _store.transaction("register_player") as tx:
+        tx.put("players", user_id_str, {
+            "username": username,
+            "role": role,
+            "answers": answers,
+            "registered_at": datetime.datetime.now().isoformat()
+        })
     return True
 
 def get_player(user_id):
@@ -39,11 +61,10 @@ def get_player(user_id):
     return db["players"].get(str(user_id))
 
 def unregister_player(user_id):
-    db = load_database()
-    if str(user_id) in db["players"]:
-        del db["players"][str(user_id)]
-        save_database(db)
-        return True
+    with _store.transaction("unregister_player") as tx:
+        if str(user_id) in tx.data["players"]:
+            tx.delete("players", str(user_id))
+            return True
     return False
 
 def get_all_players():
@@ -52,8 +73,9 @@ def get_all_players():
     return list(db["players"].values())
 
 def get_players_by_role(role_name):
-    db = load_database()
-    return [p for p in db["players"].values() if p.get("role") == role_name]
+    with _store.lock:
+        players = load_database()["players"]
+        return [players[uid] for uid in _store.sync_index(_players_index).get("role", role_name)]
 
 def is_team_full(team_id):
     # This bot might not have the full live Grid awareness if it's separate, 
@@ -64,13 +86,7 @@ def is_team_full(team_id):
     
     max_drivers = TEAMS.get(team_id, {}).get("max_drivers", 2) # Default 2 if not strict
     
-    db = load_database()
-    count = 0
-    for p in db["players"].values():
-        if p.get("role") == "driver":
-            # Check team in their answers
-            p_team = p.get("answers", {}).get("team")
-            if p_team == team_id:
-                count += 1
+    # Admitted drivers by the team in their answers
+    count = len(_store.sync_index(_players_index).get("team", team_id))
     
     return count >= max_drivers
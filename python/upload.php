@@ -1,5 +1,35 @@
 <?php
 $message = "";
+$worker_url = "http://127.0.0.1:8765"; // ocr_worker.py (spusť: py ocr_worker.py)
+
+// Pošle JSON na OCR worker, vrací dekódovanou odpověď nebo null, když neběží
+function worker_request($url, $body = null) {
+    $options = ["http" => ["timeout" => 5, "ignore_errors" => true]];
+    if ($body !== null) {
+        $options["http"]["method"] = "POST";
+        $options["http"]["header"] = "Content-Type: application/json";
+        $options["http"]["content"] = json_encode($body);
+    }
+    $response = @file_get_contents($url, false, stream_context_create($options));
+    return $response === false ? null : json_decode($response, true);
+}
+
+// Dotaz na stav úlohy: upload.php?job=<id>
+if (isset($_GET["job"])) {
+    $job = worker_request($worker_url . "/jobs/" . rawurlencode($_GET["job"]));
+    if ($job === null) {
+        $message = "❌ OCR worker neběží.";
+    } elseif (isset($job["error"]) && !isset($job["status"])) {
+        $message = "❌ " . htmlspecialchars($job["error"]);
+    } elseif (in_array($job["status"], ["queued", "running"])) {
+        header("Refresh: 2");
+        $message = "⏳ Zpracovává se (" . htmlspecialchars($job["status"]) . ")...";
+    } elseif ($job["status"] === "done") {
+        $message = "✅ Hotovo za " . $job["ocr_seconds"] . " s<br><pre>" . htmlspecialchars($job["result"]) . "</pre>";
+    } else {
+        $message = "❌ Zpracování selhalo: " . htmlspecialchars($job["error"] ?? "?");
+    }
+}
 
 if (isset($_POST["submit"])) {
     $target_dir = "uploads/";
@@ -11,19 +41,28 @@ if (isset($_POST["submit"])) {
     $target_file = $target_dir . time() . "_" . $filename; // Unikátní název
 
     if (move_uploaded_file($_FILES["fileToUpload"]["tmp_name"], $target_file)) {
-        // CESTY - Uprav podle svého PC!
-        $python_path = "py"; // Nebo celá cesta k python.exe
-        $script_path = "C:/Projects/python/good-night/f1hook.py";
         $abs_image_path = realpath($target_file);
 
-        // SPUŠTĚNÍ PYTHONU
-        // Příkaz: py c:/cesta/skript.py c:/cesta/obrazek.jpg
-        $command = escapeshellcmd(
-            "$python_path \"$script_path\" \"$abs_image_path\"",
-        );
-        $output = shell_exec($command . " 2>&1"); // Zachytí i případné chyby
+        // Nejdřív OCR worker: odpoví hned s ID úlohy, výsledek jde na Discord sám
+        $job = worker_request($worker_url . "/jobs", ["path" => $abs_image_path]);
+        if ($job !== null && isset($job["job_id"])) {
+            $job_link = "?job=" . rawurlencode($job["job_id"]);
+            $message = "✅ Obrázek nahrán a zařazen ke zpracování! <a href=\"$job_link\">Stav úlohy</a>";
+        } else {
+            // Worker neběží - postaru, jeden proces na obrázek
+            // CESTY - Uprav podle svého PC!
+            $python_path = "py"; // Nebo celá cesta k python.exe
+            $script_path = "C:/Projects/python/good-night/f1hook.py";
+
+            // SPUŠTĚNÍ PYTHONU
+            // Příkaz: py c:/cesta/skript.py c:/cesta/obrazek.jpg
+            $command = escapeshellcmd(
+                "$python_path \"$script_path\" \"$abs_image_path\"",
+            );
+            $output = shell_exec($command . " 2>&1"); // Zachytí i případné chyby
 
-        $message = "✅ Obrázek nahrán a odeslán ke zpracování!<br><pre>$output</pre>";
+            $message = "✅ Obrázek nahrán a odeslán ke zpracování!<br><pre>$output</pre>";
+        }
     } else {
         $message = "❌ Chyba při nahrávání souboru.";
     }